@@ -0,0 +1,101 @@
+import asyncio
+import subprocess
+from contextlib import nullcontext
+from functools import partial
+from itertools import islice
+from ontology_viz import OntologyGraph
+
+
+__all__ = ['AsyncOntologyGraph']
+
+
+def _batch(lines, size):
+    return ''.join(line + '\n' for line in islice(lines, size))
+
+
+class AsyncOntologyGraph:
+    """ asyncio facade of an OntologyGraph.
+
+    Parsing and dot generation run in an executor, the default thread pool
+    unless one is given, and graphviz runs as an asyncio subprocess fed while
+    the dot text is generated, so the event loop is never blocked. limit, e.g.
+    an asyncio.Semaphore shared by several graphs, bounds the number of
+    graphviz processes running at once. Cancelling a render kills its process.
+
+        og = await AsyncOntologyGraph.load(files, config, ontology=ontology)
+        svg = await og.render('svg')
+    """
+    def __init__(self, og, executor=None, limit=None):
+        self.og = og
+        self.executor = executor
+        self.limit = limit
+
+    @classmethod
+    async def load(cls, files, config, format='ttl', executor=None, limit=None, graph=OntologyGraph, **kwargs):
+        """ Read the files into graph(files, config, format, **kwargs) in the executor. """
+        og = await cls._call(executor, partial(graph, files, config, format, **kwargs))
+        return cls(og, executor, limit)
+
+    @staticmethod
+    def _call(executor, function, *args):
+        return asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+    def run(self, method, *args, **kwargs):
+        """ Call a method of the OntologyGraph in the executor, e.g. await og.run('neighborhood', seeds). """
+        return self._call(self.executor, partial(getattr(self.og, method), *args, **kwargs))
+
+    async def generate(self):
+        return await self.run('generate')
+
+    async def write_file(self, file):
+        await self.run('write_file', file)
+
+    async def export(self, file, format='json'):
+        await self.run('export', file, format)
+
+    async def _feed(self, stdin, batch_size):
+        lines = self.og.iter_dot()
+        try:
+            while True:
+                batch = await self._call(self.executor, _batch, lines, batch_size)
+                if not batch:
+                    break
+                stdin.write(batch.encode('utf-8'))
+                await stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # graphviz stopped early, its exit status tells why
+        finally:
+            stdin.close()
+
+    async def render_stream(self, format='svg', engine='dot', options=(), chunk_size=1 << 16, batch_size=10000):
+        """ Lay out the graph with graphviz and yield its output in chunks while it is written. """
+        command = [engine, '-T' + format] + list(options)
+        async with self.limit if self.limit is not None else nullcontext():
+            try:
+                process = await asyncio.create_subprocess_exec(*command, stdin=subprocess.PIPE,
+                                                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            except FileNotFoundError:
+                raise FileNotFoundError("Graphviz {} executable not found.\n"
+                                        "Please install graphviz or use write_file function to save dot file "
+                                        "and generate the graph manually.".format(engine))
+            feeder = asyncio.ensure_future(self._feed(process.stdin, batch_size))
+            errors = asyncio.ensure_future(process.stderr.read())
+            try:
+                while True:
+                    chunk = await process.stdout.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+                await feeder
+                if await process.wait():
+                    raise subprocess.CalledProcessError(process.returncode, command, None, await errors)
+            finally:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                feeder.cancel()
+                errors.cancel()
+
+    async def render(self, format='svg', engine='dot', options=()):
+        """ The graph laid out by graphviz as bytes. """
+        return b''.join([chunk async for chunk in self.render_stream(format, engine, options)])
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+from itertools import chain
+from rdflib import URIRef
+from ontology_viz import OntologyGraph
+from namespace import split_uri, is_ncname
+from utils import Config
+from instrument import Profiler
+
+
+RDF_TYPE = '<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>'
+SUB_CLASS_OF = '<http://www.w3.org/2000/01/rdf-schema#subClassOf>'
+OWL_CLASS = '<http://www.w3.org/2002/07/owl#Class>'
+OWL_OBJECT_PROPERTY = '<http://www.w3.org/2002/07/owl#ObjectProperty>'
+OWL_DATATYPE_PROPERTY = '<http://www.w3.org/2002/07/owl#DatatypeProperty>'
+
+
+class SyntheticOntology:
+    """ Seeded generator of an ontology and instance data in N-Triples (also valid Turtle).
+
+    Classes form a hierarchy of the given depth, every instance has one class and
+    links_per_instance property values, literal_ratio of which are literals.
+    bnode_ratio of the instances are blank nodes and all terms are spread over
+    the given number of namespaces. """
+    def __init__(self, classes=50, instances=10000, links_per_instance=3, literal_ratio=0.3, namespaces=5,
+                 bnode_ratio=0.05, depth=3, properties=20, seed=0):
+        self.classes = classes
+        self.instances = instances
+        self.links_per_instance = links_per_instance
+        self.literal_ratio = literal_ratio
+        self.namespaces = namespaces
+        self.bnode_ratio = bnode_ratio
+        self.depth = depth
+        self.properties = properties
+        self.seed = seed
+
+    def params(self):
+        return dict(vars(self))
+
+    def _uri(self, kind, i):
+        return '<http://bench.example.org/ns{}/{}{}>'.format(i % self.namespaces, kind, i)
+
+    def _instance(self, i):
+        if i < self.instances * self.bnode_ratio:
+            return '_:b{}'.format(i)
+        return self._uri('Instance', i)
+
+    def write_ontology(self, f):
+        rnd = random.Random(self.seed)
+        levels = [list(range(self.classes))[level::self.depth] for level in range(self.depth)]
+        for level, classes in enumerate(levels):
+            for i in classes:
+                f.write('{} {} {} .\n'.format(self._uri('Class', i), RDF_TYPE, OWL_CLASS))
+                if level:
+                    parent = rnd.choice(levels[level - 1])
+                    f.write('{} {} {} .\n'.format(self._uri('Class', i), SUB_CLASS_OF, self._uri('Class', parent)))
+        for i in range(self.properties):
+            kind = OWL_DATATYPE_PROPERTY if i % 2 else OWL_OBJECT_PROPERTY
+            f.write('{} {} {} .\n'.format(self._uri('property', i), RDF_TYPE, kind))
+
+    def write_data(self, f):
+        rnd = random.Random(self.seed + 1)
+        for i in range(self.instances):
+            subject = self._instance(i)
+            f.write('{} {} {} .\n'.format(subject, RDF_TYPE, self._uri('Class', rnd.randrange(self.classes))))
+            for _ in range(self.links_per_instance):
+                if rnd.random() < self.literal_ratio:
+                    prop = self._uri('property', rnd.randrange(1, self.properties, 2) if self.properties > 1 else 0)
+                    f.write('{} {} "value {}" .\n'.format(subject, prop, rnd.randrange(self.instances)))
+                else:
+                    prop = self._uri('property', rnd.randrange(0, self.properties, 2))
+                    f.write('{} {} {} .\n'.format(subject, prop, self._instance(rnd.randrange(self.instances))))
+
+    def write(self, directory):
+        ontology = os.path.join(directory, 'ontology.nt')
+        data = os.path.join(directory, 'data.nt')
+        with open(ontology, 'w') as f:
+            self.write_ontology(f)
+        with open(data, 'w') as f:
+            self.write_data(f)
+        return data, ontology
+
+
+def run(generator, memory=True, render=True, directory=None):
+    """ Run OntologyGraph on the generated data under a Profiler and return its report.
+
+    Reading records the ontology, parse and read stages, generating the dot text
+    emit and labels, and graphviz render. split_uri and is_ncname are timed
+    over the node URIs on their own. """
+    config = Config()
+    config.class_inference_in_object = {URIRef('http://www.w3.org/2000/01/rdf-schema#subClassOf')}
+    profiler = Profiler(memory)
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        with profiler.stage('generate'):
+            data, ontology = generator.write(tmp)
+        og = OntologyGraph(data, config, 'nt', ontology=ontology, profiler=profiler)
+        uris = [str(uri) for uri in chain(og.classes, og.instances) if not og._is_blank(uri)]
+        with profiler.stage('split_uri') as record:
+            names = [split_uri(uri)[1] for uri in uris]
+            record['uris'] = len(uris)
+        with profiler.stage('is_ncname') as record:
+            for name in names:
+                is_ncname(name)
+            record['names'] = len(names)
+        dot = og.generate()
+        if render and shutil.which('dot'):
+            og.render('svg', os.devnull)
+    report = og.report()
+    report.update(commit=git_commit(), params=generator.params(), triples=len(og.g), dot_lines=dot.count('\n') + 1)
+    return report
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _seconds(stages):
+    """ {stage: seconds} of a report, also of the {stage: result} results of older versions. """
+    if isinstance(stages, dict):
+        return {name: result['seconds'] for name, result in stages.items()}
+    seconds = {}
+    for record in stages:
+        seconds[record['name']] = seconds.get(record['name'], 0) + record['seconds']
+    return seconds
+
+
+def compare(previous, current):
+    lines = ['{:<20} {:>10} {:>10} {:>8}'.format('stage', 'before', 'after', 'ratio')]
+    previous = _seconds(previous['stages'])
+    for name, after in _seconds(current['stages']).items():
+        before = previous.get(name)
+        ratio = '{:.2f}'.format(after / before) if before else '-'
+        before = '{:.3f}'.format(before) if before is not None else '-'
+        lines.append('{:<20} {:>10} {:>10.3f} {:>8}'.format(name, before, after, ratio))
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the stages of OntologyGraph on synthetic data')
+    parser.add_argument('--classes', type=int, default=50, help='Number of classes.')
+    parser.add_argument('--instances', type=int, default=10000, help='Number of instances.')
+    parser.add_argument('--links', type=int, default=3, help='Property values per instance.')
+    parser.add_argument('--literal-ratio', type=float, default=0.3, help='Share of property values that are literals.')
+    parser.add_argument('--namespaces', type=int, default=5, help='Number of namespaces.')
+    parser.add_argument('--bnode-ratio', type=float, default=0.05, help='Share of instances that are blank nodes.')
+    parser.add_argument('--depth', type=int, default=3, help='Depth of the class hierarchy.')
+    parser.add_argument('--properties', type=int, default=20, help='Number of properties.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed.')
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help="Don't trace allocations, which slows down every stage.")
+    parser.add_argument('--no-render', dest='render', action='store_false', help="Don't run graphviz dot.")
+    parser.add_argument('-o', '--output', dest='out', default=None, help='Write the results as JSON to this file.')
+    parser.add_argument('--compare', dest='compare', default=None,
+                        help='Print the stage times against a previous JSON result.')
+    args = parser.parse_args()
+
+    generator = SyntheticOntology(args.classes, args.instances, args.links, args.literal_ratio, args.namespaces,
+                                  args.bnode_ratio, args.depth, args.properties, args.seed)
+    results = run(generator, args.memory, args.render)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(json.load(f), results))
+    elif not args.out:
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,84 @@
+from collections import Counter
+
+
+__all__ = ['rank', 'plan', 'RANKINGS', 'DOT_ELEMENTS_PER_SECOND']
+
+
+RANKINGS = ('degree', 'class', 'pagerank')
+
+# rough number of nodes plus edges dot lays out per second on graphs of a few
+# thousand elements, used to turn a time budget into a size cap
+DOT_ELEMENTS_PER_SECOND = 1000
+
+
+def rank(adjacency, nodes, classes=(), by='degree', iterations=20, damping=0.85):
+    """ The nodes ordered from most to least important.
+
+    'degree' orders by the number of edges, 'class' puts the classes first and
+    then orders by degree, 'pagerank' orders by PageRank with the edges taken
+    in both directions. Ties are broken by the node, so the order is stable. """
+    if by not in RANKINGS:
+        raise ValueError("Can't rank by {}, use one of {}".format(by, ', '.join(RANKINGS)))
+    nodes = set(nodes)
+    degree = {node: len(adjacency.out.get(node, ())) + len(adjacency.inc.get(node, ())) for node in nodes}
+    if by == 'pagerank':
+        score = _pagerank(adjacency, nodes, degree, iterations, damping)
+        return sorted(nodes, key=lambda node: (-score[node], str(node)))
+    if by == 'class':
+        return sorted(nodes, key=lambda node: (node not in classes, -degree[node], str(node)))
+    return sorted(nodes, key=lambda node: (-degree[node], str(node)))
+
+
+def _pagerank(adjacency, nodes, degree, iterations, damping):
+    size = len(nodes) or 1
+    score = dict.fromkeys(nodes, 1 / size)
+    for _ in range(iterations):
+        dangling = sum(score[node] for node in nodes if not degree[node])
+        base = (1 - damping + damping * dangling) / size
+        new = dict.fromkeys(nodes, base)
+        for node in nodes:
+            if degree[node]:
+                share = damping * score[node] / degree[node]
+                for neighbor in adjacency.neighbors(node):
+                    if neighbor in new:
+                        new[neighbor] += share
+        score = new
+    return score
+
+
+def _prefix(order, adjacency, max_nodes, max_edges, max_elements):
+    """ Length of the longest prefix of order whose nodes and the edges between them fit the caps. """
+    kept = set()
+    edges = 0
+    for k, node in enumerate(order):
+        added = sum(1 for _, o in adjacency.out.get(node, ()) if o in kept or o == node) + \
+            sum(1 for _, s in adjacency.inc.get(node, ()) if s in kept and s != node)
+        if (max_nodes is not None and k + 1 > max_nodes) or \
+                (max_edges is not None and edges + added > max_edges) or \
+                (max_elements is not None and k + 1 + edges + added > max_elements):
+            return k
+        kept.add(node)
+        edges += added
+    return len(order)
+
+
+def _less(value, reserve):
+    return None if value is None else max(value - reserve, 0)
+
+
+def plan(order, adjacency, groups, max_nodes=None, max_edges=None, max_elements=None):
+    """ The nodes to draw and {group: number of pruned nodes}.
+
+    order comes from rank, groups maps a node to the node its placeholder
+    attaches to, e.g. its class. Pruned nodes whose group isn't drawn are
+    counted into the None group. Every group with pruned nodes needs one
+    placeholder node and one edge, room for them is kept within the caps. """
+    reserve = 0
+    while True:
+        k = _prefix(order, adjacency, _less(max_nodes, reserve), _less(max_edges, reserve),
+                    _less(max_elements, 2 * reserve))
+        kept = set(order[:k])
+        pruned = Counter(group if group in kept else None for group in map(groups, order[k:]))
+        if len(pruned) <= reserve:
+            return kept, pruned
+        reserve = len(pruned)
@@ -0,0 +1,65 @@
+import os
+import pickle
+import sqlite3
+import tempfile
+
+
+__all__ = ['DiskSet']
+
+
+class DiskSet:
+    """ A set of picklable records spilled to a temporary sqlite file.
+
+    Used in place of the in-memory edge and literal sets when streaming, so that
+    memory does not grow with the number of triples. Records are deduplicated by
+    their pickled form and iterated in insertion order. """
+    def __init__(self, directory=None, batch_size=10000):
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite', dir=directory)
+        os.close(fd)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute('PRAGMA journal_mode=OFF')
+        self.db.execute('PRAGMA synchronous=OFF')
+        self.db.execute('CREATE TABLE records (record BLOB PRIMARY KEY)')
+        self.batch_size = batch_size
+        self._pending = []
+
+    def _flush(self):
+        if self._pending:
+            self.db.executemany('INSERT OR IGNORE INTO records VALUES (?)', self._pending)
+            self._pending = []
+
+    def add(self, record):
+        self._pending.append((pickle.dumps(record, pickle.HIGHEST_PROTOCOL),))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+
+    def discard(self, record):
+        self._flush()
+        self.db.execute('DELETE FROM records WHERE record = ?', (pickle.dumps(record, pickle.HIGHEST_PROTOCOL),))
+
+    def __contains__(self, record):
+        self._flush()
+        cursor = self.db.execute('SELECT 1 FROM records WHERE record = ?',
+                                 (pickle.dumps(record, pickle.HIGHEST_PROTOCOL),))
+        return cursor.fetchone() is not None
+
+    def __iter__(self):
+        self._flush()
+        for record, in self.db.execute('SELECT record FROM records ORDER BY rowid'):
+            yield pickle.loads(record)
+
+    def __len__(self):
+        self._flush()
+        return self.db.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+            os.remove(self.path)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
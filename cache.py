@@ -0,0 +1,98 @@
+import os
+import pickle
+import zlib
+from hashlib import sha1, sha256
+
+
+__all__ = ['ParseCache']
+
+
+class ParseCache:
+    """ On-disk cache of parsed and classified input files.
+
+    Entries are stored as zlib compressed pickles named by a hash of the file
+    content, the input format and the configuration fingerprint. A small
+    reference file keyed by path, size and mtime points to the entry, so files
+    that were not touched are not even hashed. The least recently used files
+    are evicted once the directory grows beyond max_size bytes. """
+    def __init__(self, directory, max_size=1 << 30):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, ext):
+        return os.path.join(self.directory, key + ext)
+
+    @staticmethod
+    def _key(*parts):
+        return sha1('\0'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+    def _stat_key(self, file, *context):
+        stat = os.stat(file)
+        return self._key(os.path.abspath(file), stat.st_size, stat.st_mtime_ns, *context)
+
+    def _content_key(self, file, *context):
+        digest = sha256()
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return self._key(digest.hexdigest(), *context)
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def get(self, file, *context):
+        """ Return the cached value for the file in the given context, or None. """
+        ref = self._path(self._stat_key(file, *context), '.ref')
+        key = None
+        if os.path.exists(ref):
+            with open(ref) as f:
+                key = f.read().strip()
+            self._touch(ref)
+        if key is None or not os.path.exists(self._path(key, '.bin')):
+            key = self._content_key(file, *context)
+            if not os.path.exists(self._path(key, '.bin')):
+                return None
+            self._write(ref, key.encode('ascii'))
+        entry = self._path(key, '.bin')
+        try:
+            with open(entry, 'rb') as f:
+                value = pickle.loads(zlib.decompress(f.read()))
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError):
+            return None
+        self._touch(entry)
+        return value
+
+    def put(self, file, value, *context):
+        key = self._content_key(file, *context)
+        self._write(self._path(key, '.bin'), zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+        self._write(self._path(self._stat_key(file, *context), '.ref'), key.encode('ascii'))
+        self.evict()
+
+    @staticmethod
+    def _write(path, data):
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(('.bin', '.ref')):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,107 @@
+from array import array
+
+
+__all__ = ['TermTable', 'TermTupleTable']
+
+
+class TermTable:
+    """ Interns terms: every distinct term is stored once and numbered in order of appearance. """
+    __slots__ = ('ids', 'terms')
+
+    def __init__(self):
+        self.ids = {}
+        self.terms = []
+
+    def id(self, term):
+        i = self.ids.get(term)
+        if i is None:
+            i = self.ids[term] = len(self.terms)
+            self.terms.append(term)
+        return i
+
+    def intern(self, term):
+        """ The stored instance equal to term, so equal terms share one object. """
+        return self.terms[self.id(term)]
+
+    def __getitem__(self, i):
+        return self.terms[i]
+
+    def __len__(self):
+        return len(self.terms)
+
+
+class TermTupleTable:
+    """ A set of fixed width term tuples, e.g. edges, held as parallel array('I') columns of term ids.
+
+    Rows are appended as they come, which costs 4 bytes per column. Duplicates are
+    dropped the next time the table is iterated, measured or searched, by sorting
+    the rows packed into one integer each, so that step needs about 40 bytes per row. """
+    __slots__ = ('terms', 'width', 'columns', 'sorted_rows')
+
+    def __init__(self, terms, width=3):
+        self.terms = terms
+        self.width = width
+        self.columns = tuple(array('I') for _ in range(width))
+        self.sorted_rows = 0
+
+    def add(self, record):
+        for column, term in zip(self.columns, record):
+            column.append(self.terms.id(term))
+
+    def _compact(self):
+        if self.sorted_rows == len(self.columns[0]):
+            return
+        # ids are below len(terms), so the packed keys sort like the rows of ids
+        bits = max(len(self.terms) - 1, 1).bit_length()
+        keys = list(self.columns[0])
+        for column in self.columns[1:]:
+            keys = [key << bits | i for key, i in zip(keys, column)]
+        keys.sort()
+        self.columns = tuple(array('I') for _ in range(self.width))
+        mask = (1 << bits) - 1
+        shifts = [bits * (self.width - 1 - n) for n in range(self.width)]
+        previous = None
+        for key in keys:
+            if key != previous:
+                for column, shift in zip(self.columns, shifts):
+                    column.append(key >> shift & mask)
+                previous = key
+        self.sorted_rows = len(self.columns[0])
+
+    def _find(self, record):
+        """ Row of record, or None. Rows are sorted after _compact, so this is a binary search. """
+        ids = tuple(self.terms.ids.get(term) for term in record)
+        if None in ids:
+            return None
+        self._compact()
+        columns = self.columns
+        low, high = 0, self.sorted_rows
+        while low < high:
+            middle = (low + high) // 2
+            if tuple(column[middle] for column in columns) < ids:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.sorted_rows and tuple(column[low] for column in columns) == ids:
+            return low
+        return None
+
+    def discard(self, record):
+        row = self._find(record)
+        if row is not None:
+            for column in self.columns:
+                del column[row]
+            self.sorted_rows -= 1
+
+    def __contains__(self, record):
+        return self._find(record) is not None
+
+    def __len__(self):
+        self._compact()
+        return self.sorted_rows
+
+    def __iter__(self):
+        self._compact()
+        terms = self.terms.terms
+        for ids in zip(*self.columns):
+            yield tuple(terms[i] for i in ids)
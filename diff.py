@@ -0,0 +1,107 @@
+from ontology_viz import OntologyGraph, node_color
+from ontology_index import OntologyIndex
+
+
+__all__ = ['DiffGraph', 'DIFF_COLORS']
+
+
+ADDED, REMOVED, CHANGED = 'added', 'removed', 'changed'
+DIFF_COLORS = {
+    ADDED: '#2ca02c',
+    REMOVED: '#d62728',
+    CHANGED: '#9467bd',
+}
+
+
+class DiffGraph(OntologyGraph):
+    """ Both versions of a graph in one, drawn around what changed between them.
+
+    The old and new files are read into an OntologyGraph each and merged, the
+    new version winning for classes of instances, labels and tooltips. Edges are compared
+    through sets of their hashes. Nodes and edges only in the new version are
+    added, only in the old version removed, and nodes in both whose class,
+    label, tooltips or edges differ are changed. Only these nodes and the nodes
+    within context edges of them are drawn. Blank nodes of Turtle files get new
+    ids on every parse, so their triples always show up as changed. """
+    def __init__(self, old_files, new_files, config, format='ttl', ontology=None, stream=False, jobs=1,
+                 cache=None, compact=False, profiler=None, context=1):
+        super().__init__([], config, format, stream=stream, compact=compact, profiler=profiler)
+        if isinstance(ontology, str):
+            # loaded once for both versions
+            ontology = OntologyIndex.load(ontology) if OntologyIndex.is_index(ontology) \
+                else OntologyIndex.from_files(ontology)
+        versions = []
+        for files in (old_files, new_files):
+            with self._stage('read_' + ('old' if not versions else 'new')):
+                versions.append(OntologyGraph(files, config, format, ontology=ontology, stream=stream, jobs=jobs,
+                                              cache=cache, compact=compact, profiler=profiler))
+        old, new = versions
+        self.warnings = old.warnings + new.warnings
+        with self._stage('diff'):
+            self.node_status, self.edge_status = self._compare(old, new)
+        # merged tooltips would add up, only removed nodes keep the ones of the old version
+        partial = old.partial()
+        partial['tooltips'] = {uri: tooltips for uri, tooltips in partial['tooltips'].items()
+                               if self.node_status.get(uri) == REMOVED}
+        self.merge(partial)
+        self.merge(new.partial())
+        self.select(self.adjacency().neighborhood(self.node_status, context))
+
+    @staticmethod
+    def _nodes(og):
+        nodes = set(og.classes)
+        nodes.update(og.instances)
+        nodes.update(uri for uri, _ in og.literals)
+        return nodes
+
+    @staticmethod
+    def _difference(edges, other):
+        # only the hashes of one side are held, the edges may be on disk or in columns of ids
+        hashes = {hash(triple) for triple in other}
+        return [triple for triple in edges if hash(triple) not in hashes]
+
+    def _compare(self, old, new):
+        """ ({node: status}, {edge: status}) of everything that differs between the versions. """
+        edge_status = dict.fromkeys(self._difference(new.edges, old.edges), ADDED)
+        edge_status.update(dict.fromkeys(self._difference(old.edges, new.edges), REMOVED))
+        old_nodes, new_nodes = self._nodes(old), self._nodes(new)
+        node_status = dict.fromkeys(new_nodes - old_nodes, ADDED)
+        node_status.update(dict.fromkeys(old_nodes - new_nodes, REMOVED))
+        common = old_nodes & new_nodes
+        changed = {node for node in common if old.instances.get(node) != new.instances.get(node)
+                   or (node in old.classes) != (node in new.classes)}
+        for mapping in (old.labels, new.labels):
+            changed.update(node for node in mapping if node in common
+                           and old.labels.get(node) != new.labels.get(node))
+        for mapping in (old.tooltips, new.tooltips):
+            changed.update(node for node in mapping if node in common
+                           and old.tooltips.get(node, []) != new.tooltips.get(node, []))
+        for s, _, o in edge_status:
+            changed.update(node for node in (s, o) if node in common)
+        node_status.update(dict.fromkeys(changed, CHANGED))
+        return node_status, edge_status
+
+    def summary(self):
+        """ Number of added, removed and changed nodes and of added and removed edges. """
+        counts = {'nodes': dict.fromkeys((ADDED, REMOVED, CHANGED), 0), 'edges': dict.fromkeys((ADDED, REMOVED), 0)}
+        for status in self.node_status.values():
+            counts['nodes'][status] += 1
+        for status in self.edge_status.values():
+            counts['edges'][status] += 1
+        return counts
+
+    def _dot_node(self, uri, attrs):
+        status = self.node_status.get(uri)
+        return super()._dot_node(uri, node_color(DIFF_COLORS[status]) if status else attrs)
+
+    def _dot_literal_node(self, uri, literal, attrs=None):
+        status = self.node_status.get(uri)
+        return super()._dot_literal_node(uri, literal, node_color(DIFF_COLORS[status]) if status else attrs)
+
+    def _dot_edge(self, s, p, o):
+        status = self.edge_status.get((s, p, o))
+        if status is None:
+            return super()._dot_edge(s, p, o)
+        return '  "{}" -> "{}" [label="{}" color="{}" fontcolor="{}"{}]'.format(
+            s, o, self._pred_label(p), DIFF_COLORS[status], DIFF_COLORS[status],
+            ' style="dashed"' if status == REMOVED else '')
@@ -0,0 +1,145 @@
+import json
+from itertools import chain
+from xml.sax.saxutils import escape, quoteattr
+
+
+__all__ = ['EXPORTERS', 'register', 'iter_node_data', 'iter_edge_data']
+
+
+def iter_node_data(og):
+    """ A dict per drawn node with its id, label, category (class, instance, literal, blank or
+    placeholder), color and, if it has them, the class of an instance, a tooltip and the status
+    of a diff. Every node comes once, a class used as an instance is a class. Edge ends without
+    a node of their own, e.g. untyped subjects, are instances without a color. """
+    classes, instances, literals = og._selected()
+    classes = set(classes)
+    uris = chain(classes, (uri for uri, _ in instances))
+    og.compute_labels((uri for uri in uris if not og._is_blank(uri)), og.config.max_label_length)
+    seen = set(classes)
+    for uri in classes:
+        yield _uri_data(og, uri, 'class', og.config.get_cls_color(uri))
+    for uri, class_ in instances:
+        if uri not in seen:
+            seen.add(uri)
+            data = _uri_data(og, uri, 'instance', og.config.get_ins_color(class_))
+            if class_ is not None:
+                data['class'] = str(class_)
+            yield data
+    for uri, literal in literals:
+        seen.add(uri)
+        yield _status(og, uri, {'id': str(uri), 'label': str(literal), 'category': 'literal',
+                                'color': og.config.colors.lit})
+    for s, _, o in og._selected_edges():
+        for uri in (s, o):
+            if uri not in seen:
+                seen.add(uri)
+                yield _uri_data(og, uri, 'instance', None)
+    for uri, count, _ in og.placeholders:
+        yield {'id': uri, 'label': '+{} more'.format(count), 'category': 'placeholder', 'count': count}
+
+
+def _uri_data(og, uri, category, color):
+    blank = og._is_blank(uri)
+    data = {'id': str(uri), 'label': '' if blank else og.compute_label(uri, og.config.max_label_length),
+            'category': 'blank' if blank else category, 'color': color}
+    tooltip = og._tooltip(uri)
+    if tooltip:
+        data['tooltip'] = tooltip
+    return _status(og, uri, data)
+
+
+def _status(og, key, data):
+    # added, removed or changed in a diff.DiffGraph
+    status = getattr(og, 'node_status' if 'id' in data else 'edge_status', {}).get(key)
+    if status is not None:
+        data['status'] = status
+    return data
+
+
+def iter_edge_data(og):
+    """ A dict per drawn edge with its source, target, predicate, label and the status of a diff. """
+    for s, p, o in og._selected_edges():
+        yield _status(og, (s, p, o), {'source': str(s), 'target': str(o), 'predicate': str(p),
+                                      'label': og._pred_label(p)})
+    for uri, _, class_ in og.placeholders:
+        if class_ is not None:
+            yield {'source': uri, 'target': str(class_), 'predicate': None, 'label': ''}
+
+
+def _write_list(f, items):
+    first = True
+    for item in items:
+        if not first:
+            f.write(',\n')
+        first = False
+        f.write(json.dumps(item, ensure_ascii=False))
+
+
+def write_json(og, f):
+    """ Node-link JSON as read by networkx.node_link_graph and d3-force. """
+    f.write('{"directed": true, "multigraph": true, "graph": {},\n"nodes": [\n')
+    _write_list(f, iter_node_data(og))
+    f.write('\n],\n"links": [\n')
+    _write_list(f, (dict(edge, key=i) for i, edge in enumerate(iter_edge_data(og))))
+    f.write('\n]}')
+
+
+def write_ndjson(og, f):
+    """ One JSON object per line, nodes first, told apart by their "type": "node" or "edge". """
+    for node in iter_node_data(og):
+        f.write(json.dumps(dict(node, type='node'), ensure_ascii=False))
+        f.write('\n')
+    for edge in iter_edge_data(og):
+        f.write(json.dumps(dict(edge, type='edge'), ensure_ascii=False))
+        f.write('\n')
+
+
+def write_cytoscape(og, f):
+    """ Cytoscape.js elements JSON, usable as cytoscape({elements: ...}). """
+    f.write('{"elements": {\n"nodes": [\n')
+    _write_list(f, ({'data': node} for node in iter_node_data(og)))
+    f.write('\n],\n"edges": [\n')
+    _write_list(f, ({'data': dict(edge, id='e{}'.format(i))} for i, edge in enumerate(iter_edge_data(og))))
+    f.write('\n]}}')
+
+
+GRAPHML_NODE_KEYS = ('label', 'category', 'color', 'class', 'tooltip', 'count', 'status')
+GRAPHML_EDGE_KEYS = ('predicate', 'label', 'status')
+
+
+def write_graphml(og, f):
+    """ GraphML with the node and edge fields as data keys. """
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+    for key in GRAPHML_NODE_KEYS:
+        f.write('  <key id="n_{0}" for="node" attr.name="{0}" attr.type="{1}"/>\n'.format(
+            key, 'int' if key == 'count' else 'string'))
+    for key in GRAPHML_EDGE_KEYS:
+        f.write('  <key id="e_{0}" for="edge" attr.name="{0}" attr.type="string"/>\n'.format(key))
+    f.write('  <graph edgedefault="directed">\n')
+    for node in iter_node_data(og):
+        f.write('    <node id={}>'.format(quoteattr(node['id'])))
+        for key in GRAPHML_NODE_KEYS:
+            if node.get(key) is not None:
+                f.write('<data key="n_{}">{}</data>'.format(key, escape(str(node[key]))))
+        f.write('</node>\n')
+    for edge in iter_edge_data(og):
+        f.write('    <edge source={} target={}>'.format(quoteattr(edge['source']), quoteattr(edge['target'])))
+        for key in GRAPHML_EDGE_KEYS:
+            if edge.get(key) is not None:
+                f.write('<data key="e_{}">{}</data>'.format(key, escape(str(edge[key]))))
+        f.write('</edge>\n')
+    f.write('  </graph>\n</graphml>')
+
+
+EXPORTERS = {
+    'json': write_json,
+    'ndjson': write_ndjson,
+    'cytoscape': write_cytoscape,
+    'graphml': write_graphml,
+}
+
+
+def register(name, exporter):
+    """ Make exporter(og, f) available as OntologyGraph.export(file, name). """
+    EXPORTERS[name] = exporter
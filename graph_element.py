@@ -1,14 +1,18 @@
 class Element:
-    def __init__(self, id_, attrs=None):
+    __slots__ = ('id', 'attrs', 'style')
+
+    def __init__(self, id_, attrs=None, style=None):
         self.id = id_
         self.attrs = attrs if attrs else dict()
+        self.style = style  # attributes shared by many elements, never modified
 
     def update(self, new_attrs):
         self.attrs.update(new_attrs)
 
     def to_draw(self):
-        if self.attrs:
-            attrs = ' '.join(['{}="{}"'.format(k, v) for k, v in self.attrs.items()])
+        attrs = dict(self.style, **self.attrs) if self.style else self.attrs
+        if attrs:
+            attrs = ' '.join(['{}="{}"'.format(k, v) for k, v in attrs.items()])
             return '{} [{}]'.format(self.id, attrs)
         return self.id
 
@@ -40,8 +44,10 @@ class Element:
 
 
 class Node(Element):
-    def __init__(self, id_, attrs):
-        super().__init__('"{}"'.format(id_), attrs)
+    __slots__ = ()
+
+    def __init__(self, id_, attrs=None, style=None):
+        super().__init__('"{}"'.format(id_), attrs, style)
 
     def set_color(self, color):
         super().set_color(color)
@@ -49,10 +55,12 @@ class Node(Element):
 
 
 class Edge(Element):
-    def __init__(self, from_, to, attrs):
+    __slots__ = ()
+
+    def __init__(self, from_, to, attrs=None, style=None):
         if isinstance(from_, Node):
             from_ = from_.id
         if isinstance(to, Node):
             to = to.id
         id_ = '"{}" -> "{}"'.format(from_, to)
-        super().__init__(id_, attrs)
+        super().__init__(id_, attrs, style)
@@ -0,0 +1,107 @@
+import bz2
+import gzip
+import lzma
+import mmap
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from xml.sax import SAXParseException
+from rdflib.exceptions import ParserError
+from rdflib.plugin import PluginException
+from rdflib.plugins.parsers.notation3 import BadSyntax
+
+
+__all__ = ['compression', 'open_input', 'iter_lines', 'parse_file', 'PARSE_ERRORS']
+
+
+# malformed input files or an unknown input format
+PARSE_ERRORS = (BadSyntax, ParserError, SAXParseException, PluginException)
+
+
+MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+)
+
+
+def compression(file):
+    """ 'gzip', 'bz2', 'xz' or 'zstd' if the file starts with their magic bytes, otherwise None. """
+    with open(file, 'rb') as f:
+        head = f.read(6)
+    for magic, name in MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def open_input(file):
+    """ The file opened for reading bytes, decompressed on the fly if it is compressed. """
+    kind = compression(file)
+    if kind == 'gzip':
+        return gzip.open(file, 'rb')
+    if kind == 'bz2':
+        return bz2.open(file, 'rb')
+    if kind == 'xz':
+        return lzma.open(file, 'rb')
+    if kind == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("You don't have zstandard package installed.\n"
+                              "Please install zstandard to read {}, or decompress it first.".format(file))
+        return zstandard.ZstdDecompressor().stream_reader(open(file, 'rb'), closefd=True)
+    return open(file, 'rb', buffering=1 << 20)
+
+
+@contextmanager
+def _mapped(file):
+    with open(file, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            yield memoryview(b'')
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            view = memoryview(m)
+            try:
+                yield view
+            finally:
+                view.release()
+
+
+def iter_lines(file, start=0, end=None):
+    """ Yield the lines of the file starting in the byte range [start, end), decoded from
+    UTF-8 without the line break.
+
+    Uncompressed files are memory-mapped and every line is decoded straight from
+    the mapping. Compressed files are decompressed while they are read, they can
+    only be read from the beginning. """
+    if compression(file) is not None:
+        if start or end is not None:
+            raise ValueError("Can't read a byte range of the compressed file {}".format(file))
+        with open_input(file) as f:
+            for line in f:
+                yield line.decode('utf-8').rstrip('\r\n')
+        return
+    with _mapped(file) as view:
+        size = len(view)
+        end = size if end is None else min(end, size)
+        position = start
+        while position < end:
+            stop = view.obj.find(b'\n', position)
+            if stop < 0:
+                stop = size
+            line = str(view[position:stop], 'utf-8')
+            yield line[:-1] if line.endswith('\r') else line
+            position = stop + 1
+
+
+def parse_file(graph, file, format='ttl'):
+    """ Parse the file into graph, decompressing it on the fly if it is compressed. """
+    if compression(file) is None:
+        return graph.parse(file, format=format)
+    from rdflib.parser import InputSource
+    with open_input(file) as f:
+        source = InputSource(Path(file).absolute().as_uri())
+        source.setByteStream(f)
+        return graph.parse(source, format=format)
@@ -0,0 +1,81 @@
+import resource
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+
+__all__ = ['Profiler']
+
+
+class Profiler:
+    """ Records the wall time, allocations and peak RSS of the stages of an OntologyGraph run.
+
+    Stages can nest, e.g. labels within emit. Allocations are only traced with
+    memory=True, which slows every stage down. Hooks are called as
+    hook('start', name, record) and hook('end', name, record), the record of a
+    finished stage holds its measurements. """
+    def __init__(self, memory=False, hooks=()):
+        self.memory = memory
+        self.hooks = list(hooks)
+        self.stages = []
+        self.counters = Counter()
+        self.started = time.perf_counter()
+        self._open = []
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def _notify(self, event, name, record):
+        for hook in self.hooks:
+            hook(event, name, record)
+
+    @contextmanager
+    def stage(self, name):
+        """ Measure the block. It can put counts such as 'triples' into the yielded record. """
+        record = {'name': name}
+        self._notify('start', name, record)
+        allocated = 0
+        if self.memory:
+            allocated = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._open.append((record, allocated))
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - started
+            self._open.pop()
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                record['allocated_bytes'] = current - allocated
+                record['peak_bytes'] = max(peak - allocated, record.get('peak_bytes', 0))
+                tracemalloc.reset_peak()
+                if self._open:
+                    # the peak was reset for this stage, pass it on to the enclosing one
+                    parent, parent_allocated = self._open[-1]
+                    parent['peak_bytes'] = max(parent.get('peak_bytes', 0),
+                                               allocated - parent_allocated + record['peak_bytes'])
+            record['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            if 'triples' in record:
+                record['triples_per_second'] = record['triples'] / record['seconds'] if record['seconds'] else None
+            self.stages.append(record)
+            self._notify('end', name, record)
+
+    def report(self, **sections):
+        """ The measurements as a JSON serializable dict, with sections added as extra keys. """
+        report = {
+            'python': '{}.{}.{}'.format(*sys.version_info[:3]),
+            'seconds': time.perf_counter() - self.started,
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            'stages': self.stages,
+            'counters': dict(self.counters),
+        }
+        report.update(sections)
+        return report
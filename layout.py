@@ -0,0 +1,96 @@
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("You don't have numpy package installed.\n"
+                      "Please install numpy to use the built-in layout, or lay out the dot file with graphviz.")
+
+
+__all__ = ['force_layout']
+
+
+MIN_CELL = 2.0  # twice the ideal edge length
+GRAVITY = 0.1  # pull towards the center, keeps disconnected parts from drifting apart
+
+
+def force_layout(size, edges, iterations=100, seed=0):
+    """ Fruchterman-Reingold positions of size nodes connected by (source, target) index pairs.
+
+    The ideal edge length is 1. Repulsion is computed on a grid laid over the
+    current spread of the nodes: the nodes of the own and neighboring cells act
+    from the centroid of their cell, farther cells through an FFT of the cell
+    counts, which keeps every iteration near linear in the number of nodes and
+    edges. The nodes are not confined to
+    a box, a weak pull towards their center keeps disconnected parts together.
+    Returns an array of shape (size, 2). """
+    if size == 0:
+        return np.zeros((0, 2))
+    rng = np.random.default_rng(seed)
+    side = max(np.sqrt(size), 1.0)
+    pos = rng.uniform(0, side, (size, 2))
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    source, target = edges[:, 0], edges[:, 1]
+    max_cells = int(np.ceil(side / MIN_CELL)) + 1
+    temperature = side / 10
+    for i in range(iterations):
+        disp = _repulsion(pos, max_cells)
+        delta = pos[target] - pos[source]
+        distance = np.sqrt((delta ** 2).sum(axis=1)) + 1e-9
+        pull = delta * distance[:, None]  # d^2 along the unit vector
+        for axis in range(2):
+            disp[:, axis] += np.bincount(source, pull[:, axis], size) - np.bincount(target, pull[:, axis], size)
+        disp -= (pos - pos.mean(axis=0)) * GRAVITY
+        length = np.sqrt((disp ** 2).sum(axis=1)) + 1e-9
+        step = min(temperature * (1 - i / iterations), side)
+        pos += disp * (np.minimum(length, step) / length)[:, None]
+    return pos
+
+
+def _repulsion(pos, max_cells):
+    """ Repulsive forces 1 / d between all nodes, computed on a grid of at most max_cells x max_cells.
+
+    The grid covers the nodes with cells of at least MIN_CELL. Nodes of the own
+    and the 8 neighboring cells act from the centroid of their cell. Farther
+    cells act from their center, their forces are the convolution of the node
+    counts per cell with the force kernel, done with an FFT. """
+    origin = pos.min(axis=0)
+    extent = (pos.max(axis=0) - origin).max()
+    cell = max(MIN_CELL, extent / (max_cells - 1))
+    cells = min(int(extent // cell) + 1, max_cells)
+    grid = np.minimum(((pos - origin) // cell).astype(np.int64), cells - 1)
+    cell_id = grid[:, 0] * cells + grid[:, 1]
+    counts = np.bincount(cell_id, minlength=cells * cells).astype(float)
+    sums = np.stack([np.bincount(cell_id, pos[:, axis], cells * cells) for axis in range(2)], axis=1)
+    disp = _far_field(counts.reshape(cells, cells), cell)[grid[:, 0], grid[:, 1]]
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            x, y = grid[:, 0] + dx, grid[:, 1] + dy
+            nodes = np.flatnonzero((x >= 0) & (x < cells) & (y >= 0) & (y < cells))
+            neighbor_cell = x[nodes] * cells + y[nodes]
+            count = counts[neighbor_cell]
+            total = sums[neighbor_cell]
+            if dx == 0 and dy == 0:
+                # a node doesn't repel itself
+                count = count - 1
+                total = total - pos[nodes]
+            keep = count > 0
+            nodes, count, total = nodes[keep], count[keep], total[keep]
+            delta = pos[nodes] - total / count[:, None]
+            disp[nodes] += delta * (count / ((delta ** 2).sum(axis=1) + 1e-9))[:, None]
+    return disp
+
+
+def _far_field(counts, cell):
+    """ Force per cell from the counts of all cells outside its 3x3 neighborhood, shape (cells, cells, 2). """
+    cells = len(counts)
+    offsets = np.fft.fftfreq(2 * cells, 1 / (2 * cells))  # 0, 1, ..., -1 in wrap around order
+    dx, dy = np.meshgrid(offsets, offsets, indexing='ij')
+    squared = dx ** 2 + dy ** 2
+    near = (np.abs(dx) <= 1) & (np.abs(dy) <= 1)
+    squared[near] = np.inf
+    density = np.fft.rfft2(counts, (2 * cells, 2 * cells))
+    field = np.empty(counts.shape + (2,))
+    for axis, offset in enumerate((dx, dy)):
+        kernel = np.fft.rfft2(offset / (squared * cell))
+        field[:, :, axis] = np.fft.irfft2(density * kernel, (2 * cells, 2 * cells))[:cells, :cells]
+    return field
@@ -1,4 +1,8 @@
 import os
+import re
+from bisect import bisect_right, insort
+from os.path import commonprefix
+from functools import lru_cache
 from unicodedata import category
 from urllib.parse import urljoin, urldefrag
 from urllib.request import pathname2url
@@ -203,11 +207,13 @@ class NamespaceManager(object):
         self.graph = graph
         self.__cache = {}
         self.__cache_strict = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
         self.__log = None
-        self.__strie = {}
-        self.__trie = {}
+        self.__index = NamespaceIndex()
+        self.__next_ns = 1
         for p, n in self.namespaces():  # self.bind is not always called
-            insert_trie(self.__trie, str(n))
+            self.__index.add(str(n))
         self.bind("xml", "http://www.w3.org/XML/1998/namespace")
         self.bind("rdf", RDF)
         self.bind("rdfs", RDFS)
@@ -215,10 +221,10 @@ class NamespaceManager(object):
 
     def reset(self):
         self.__cache = {}
-        self.__strie = {}
-        self.__trie = {}
-        for p, n in self.namespaces():  # repopulate the trie
-            insert_trie(self.__trie, str(n))
+        self.__index = NamespaceIndex()
+        self.__next_ns = 1
+        for p, n in self.namespaces():  # repopulate the index
+            self.__index.add(str(n))
 
     def __get_store(self):
         return self.graph.store
@@ -246,8 +252,7 @@ class NamespaceManager(object):
         """
         try:
             namespace, name = split_uri(rdfTerm)
-            if namespace not in self.__strie:
-                insert_strie(self.__strie, self.__trie, str(namespace))
+            self.__index.add(str(namespace))
             namespace = URIRef(str(namespace))
         except:
             if isinstance(rdfTerm, Variable):
@@ -270,7 +275,10 @@ class NamespaceManager(object):
                 '"{}" does not look like a valid URI, cannot serialize this. Did you want to urlencode it?'.format(uri)
             )
 
-        if uri not in self.__cache:
+        if uri in self.__cache:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
             try:
                 namespace, name = split_uri(uri)
             except ValueError as e:
@@ -278,14 +286,12 @@ class NamespaceManager(object):
                 prefix = self.store.prefix(namespace)
                 if not prefix:
                     raise e
-            if namespace not in self.__strie:
-                insert_strie(self.__strie, self.__trie, namespace)
+            self.__index.add(str(namespace))
 
-            if self.__strie[namespace]:
-                pl_namespace = get_longest_namespace(self.__strie[namespace], uri)
-                if pl_namespace is not None:
-                    namespace = pl_namespace
-                    name = uri[len(namespace):]
+            # prefer a longer known namespace of the uri, e.g. a bound one. It is at
+            # least namespace itself, which is the whole uri if it can't be split
+            namespace = self.__index.longest_prefix(uri)
+            name = uri[len(namespace):]
 
             namespace = URIRef(namespace)
             prefix = self.store.prefix(namespace)  # warning multiple prefixes problem
@@ -295,12 +301,7 @@ class NamespaceManager(object):
                     raise KeyError(
                         "No known prefix for {} and generate=False".format(namespace)
                     )
-                num = 1
-                while 1:
-                    prefix = "ns%s" % num
-                    if not self.store.namespace(prefix):
-                        break
-                    num += 1
+                prefix = self.__generate_prefix()
                 self.bind(prefix, namespace)
             self.__cache[uri] = (prefix, namespace, name)
         return self.__cache[uri]
@@ -318,7 +319,7 @@ class NamespaceManager(object):
                     namespace, name = split_uri(uri, NAME_START_CATEGORIES)
                 except ValueError as e:
                     message = ('This graph cannot be serialized to a strict format '
-                               'because there is no valid way to shorten {uri}'.format(uri))
+                               'because there is no valid way to shorten {}'.format(uri))
                     raise ValueError(message)
                     # omitted for strict since NCNames cannot be empty
                     #namespace = URIRef(uri)
@@ -326,15 +327,13 @@ class NamespaceManager(object):
                     #if not prefix:
                         #raise e
 
-                if namespace not in self.__strie:
-                    insert_strie(self.__strie, self.__trie, namespace)
+                self.__index.add(str(namespace))
 
                 # omitted for strict
-                #if self.__strie[namespace]:
-                    #pl_namespace = get_longest_namespace(self.__strie[namespace], uri)
-                    #if pl_namespace is not None:
-                        #namespace = pl_namespace
-                        #name = uri[len(namespace):]
+                #pl_namespace = self.__index.longest_prefix(uri)
+                #if len(pl_namespace) > len(namespace):
+                    #namespace = pl_namespace
+                    #name = uri[len(namespace):]
 
                 namespace = URIRef(namespace)
                 prefix = self.store.prefix(namespace)  # warning multiple prefixes problem
@@ -344,17 +343,21 @@ class NamespaceManager(object):
                         raise KeyError(
                             "No known prefix for {} and generate=False".format(namespace)
                         )
-                    num = 1
-                    while 1:
-                        prefix = "ns%s" % num
-                        if not self.store.namespace(prefix):
-                            break
-                        num += 1
+                    prefix = self.__generate_prefix()
                     self.bind(prefix, namespace)
                 self.__cache_strict[uri] = (prefix, namespace, name)
 
             return self.__cache_strict[uri]
 
+    def __generate_prefix(self):
+        # generated prefixes are taken in order, so the search can continue
+        # from the last one instead of probing the store from ns1 every time
+        num = self.__next_ns
+        while self.store.namespace("ns%s" % num):
+            num += 1
+        self.__next_ns = num + 1
+        return "ns%s" % num
+
     def bind(self, prefix, namespace, override=True, replace=False):
 
         """bind a given namespace to the prefix
@@ -381,7 +384,7 @@ class NamespaceManager(object):
 
             if replace:
                 self.store.bind(prefix, namespace)
-                insert_trie(self.__trie, str(namespace))
+                self.__index.add(str(namespace))
                 return
 
             # prefix already in use for different namespace
@@ -411,7 +414,7 @@ class NamespaceManager(object):
             else:
                 if override or bound_prefix.startswith("_"):  # or a generated prefix
                     self.store.bind(prefix, namespace)
-        insert_trie(self.__trie, str(namespace))
+        self.__index.add(str(namespace))
 
     def namespaces(self):
         for prefix, namespace in self.store.namespaces():
@@ -475,13 +478,43 @@ ALLOWED_NAME_CHARS = ["\u00B7", "\u0387", "-", ".", "_", ":"]
 #      | Extender
 
 
+# The checks below are hot, every uncached URI is split. Categories are looked
+# up once per distinct character, and ASCII input is matched with regexes built
+# from the very same category tables.
+
+_category = lru_cache(maxsize=None)(category)
+_NAME_START_SET = frozenset(NAME_START_CATEGORIES)
+_NAME_SET = frozenset(NAME_CATEGORIES)
+_ASCII = [chr(i) for i in range(128)]
+
+
+def _ascii_class(chars):
+    return '[{}]'.format(''.join(re.escape(c) for c in chars))
+
+
+_ASCII_NCNAME = re.compile('{}{}*\\Z'.format(
+    _ascii_class([c for c in _ASCII if c == '_' or category(c) in _NAME_START_SET]),
+    _ascii_class([c for c in _ASCII if category(c) in _NAME_SET or (c != ':' and c in ALLOWED_NAME_CHARS)])))
+_ASCII_NAME_CHARS = ''.join(c for c in _ASCII if category(c) in _NAME_SET or c in ALLOWED_NAME_CHARS)
+_ascii_split_start = {}
+
+
+def _split_start_regex(split_start):
+    key = tuple(split_start)
+    if key not in _ascii_split_start:
+        _ascii_split_start[key] = re.compile(_ascii_class([c for c in _ASCII if c == '_' or category(c) in key]))
+    return _ascii_split_start[key]
+
+
 def is_ncname(name):
+    if name and name.isascii():
+        return 1 if _ASCII_NCNAME.match(name) else 0
     if name:
         first = name[0]
-        if first == "_" or category(first) in NAME_START_CATEGORIES:
+        if first == "_" or _category(first) in _NAME_START_SET:
             for i in range(1, len(name)):
                 c = name[i]
-                if not category(c) in NAME_CATEGORIES:
+                if not _category(c) in _NAME_SET:
                     if c != ':' and c in ALLOWED_NAME_CHARS:
                         continue
                     return 0
@@ -500,14 +533,17 @@ XMLNS = "http://www.w3.org/XML/1998/namespace"
 def split_uri(uri, split_start=SPLIT_START_CATEGORIES):
     if uri.startswith(XMLNS):
         return (XMLNS, uri.split(XMLNS)[1])
+    if uri.isascii():
+        return _split_ascii_uri(uri, split_start)
+    split_start = frozenset(split_start)
     length = len(uri)
     for i in range(0, length):
         c = uri[-i - 1]
-        if not category(c) in NAME_CATEGORIES:
+        if not _category(c) in _NAME_SET:
             if c in ALLOWED_NAME_CHARS:
                 continue
             for j in range(-1 - i, length):
-                if category(uri[j]) in split_start or uri[j] == "_":
+                if _category(uri[j]) in split_start or uri[j] == "_":
                     # _ prevents early split, roundtrip not generate
                     ns = uri[:j]
                     if not ns:
@@ -517,36 +553,48 @@ def split_uri(uri, split_start=SPLIT_START_CATEGORIES):
             break
     raise ValueError("Can't split '{}'".format(uri))
 
-def insert_trie(trie, value):  # aka get_subtrie_or_insert
-    """ Insert a value into the trie if it is not already contained in the trie.
-        Return the subtree for the value regardless of whether it is a new value
-        or not. """
-    if value in trie:
-        return trie[value]
-    multi_check = False
-    for key in tuple(trie.keys()):
-        if len(value) > len(key) and value.startswith(key):
-            return insert_trie(trie[key], value)
-        elif key.startswith(value):  # we know the value is not in the trie
-            if not multi_check:
-                trie[value] = {}
-                multi_check = True  # there can be multiple longer existing prefixes
-            dict_ = trie.pop(key)  # does not break strie since key<->dict_ remains unchanged
-            trie[value][key] = dict_
-    if value not in trie:
-        trie[value] = {}
-    return trie[value]
-
-def insert_strie(strie, trie, value):
-    if value not in strie:
-        strie[value] = insert_trie(trie, value)
-
-def get_longest_namespace(trie, value):
-    for key in trie:
-        if value.startswith(key):
-            out = get_longest_namespace(trie[key], value)
-            if out is None:
+
+def _split_ascii_uri(uri, split_start):
+    # same walk as split_uri: find the last character that can't be part of a
+    # name, then the first split start character from there on. Like the
+    # negative indices there, the search continues from the beginning of uri.
+    tail = len(uri.rstrip(_ASCII_NAME_CHARS))
+    if tail:
+        start = _split_start_regex(split_start)
+        m = start.search(uri, tail - 1) or start.search(uri)
+        if m and m.start():
+            return (uri[:m.start()], uri[m.start():])
+    raise ValueError("Can't split '{}'".format(uri))
+
+class NamespaceIndex(object):
+    """ Set of namespaces answering longest prefix queries.
+
+    The namespaces are kept sorted. The greatest namespace not after a value is
+    either its longest prefix, or the answer is a prefix of what the two have in
+    common, so every bisect step shortens the value. """
+    def __init__(self):
+        self.__keys = []
+        self.__members = set()
+
+    def add(self, namespace):
+        if namespace not in self.__members:
+            self.__members.add(namespace)
+            insort(self.__keys, namespace)
+
+    def __contains__(self, namespace):
+        return namespace in self.__members
+
+    def __len__(self):
+        return len(self.__keys)
+
+    def longest_prefix(self, value):
+        keys = self.__keys
+        while value:
+            i = bisect_right(keys, value)
+            if not i:
+                return None
+            key = keys[i - 1]
+            if value.startswith(key):
                 return key
-            else:
-                return out
-    return None
+            value = commonprefix((value, key))
+        return None
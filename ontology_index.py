@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+import argparse
+import pickle
+import zlib
+from collections import defaultdict
+from rdflib import Graph
+from inputs import parse_file
+from namespace import RDF, OWL
+
+
+__all__ = ['OntologyIndex']
+
+
+PROPERTY_TYPES = {OWL.DatatypeProperty, OWL.ObjectProperty}
+
+
+class OntologyIndex:
+    """ Classes and properties defined by an ontology.
+
+    A class is declared as owl:Class or reaches one through owl:subClassOf, a
+    property is declared as owl:DatatypeProperty or owl:ObjectProperty or reaches
+    one through owl:subPropertyOf. The index can be saved and loaded to skip
+    parsing the ontology on every run. """
+    MAGIC = b'ONTOLOGY-INDEX 1\n'
+
+    def __init__(self, classes=(), properties=()):
+        self.classes = set(classes)
+        self.properties = set(properties)
+
+    @classmethod
+    def from_triples(cls, triples):
+        class_roots, property_roots = set(), set()
+        sub_classes, sub_properties = defaultdict(list), defaultdict(list)
+        for s, p, o in triples:
+            if p == RDF.type:
+                if o == OWL.Class:
+                    class_roots.add(s)
+                elif o in PROPERTY_TYPES:
+                    property_roots.add(s)
+            elif p == OWL.subClassOf:
+                sub_classes[o].append(s)
+            elif p == OWL.subPropertyOf:
+                sub_properties[o].append(s)
+        return cls(descendants(class_roots, sub_classes), descendants(property_roots, sub_properties))
+
+    @classmethod
+    def from_files(cls, files, format='ttl'):
+        if isinstance(files, str):
+            files = [files]
+        g = Graph()
+        for file in files:
+            parse_file(g, file, format)
+        return cls.from_triples(g)
+
+    @classmethod
+    def is_index(cls, file):
+        with open(file, 'rb') as f:
+            return f.read(len(cls.MAGIC)) == cls.MAGIC
+
+    @classmethod
+    def load(cls, file):
+        with open(file, 'rb') as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError("{} is not an ontology index".format(file))
+            classes, properties = pickle.loads(zlib.decompress(f.read()))
+        return cls(classes, properties)
+
+    def save(self, file):
+        with open(file, 'wb') as f:
+            f.write(self.MAGIC)
+            f.write(zlib.compress(pickle.dumps((sorted(self.classes), sorted(self.properties)),
+                                               pickle.HIGHEST_PROTOCOL)))
+
+
+def descendants(roots, children):
+    """ roots together with everything reachable from them in the children adjacency lists. """
+    seen = set(roots)
+    stack = list(roots)
+    while stack:
+        for child in children.get(stack.pop(), ()):
+            if child not in seen:
+                seen.add(child)
+                stack.append(child)
+    return seen
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compile ontology files into an index usable with -O')
+    parser.add_argument('files', nargs='+', help='Ontology files.')
+    parser.add_argument('-f', '--format', dest='format', default='ttl', help='Input file format.')
+    parser.add_argument('-o', '--output', dest='out', default='ontology.idx',
+                        help='Location of output index file.')
+    args = parser.parse_args()
+
+    OntologyIndex.from_files(args.files, args.format).save(args.out)
@@ -1,88 +1,316 @@
 #!/usr/bin/env python
 import argparse
-from uuid import uuid4
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager, nullcontext
+from hashlib import blake2b
+from itertools import chain
+from functools import lru_cache
 from collections import defaultdict
 from rdflib import Graph, URIRef, Literal, BNode
-from rdflib.plugins.sparql import prepareQuery
 from rdflib.namespace import RDF, RDFS, SKOS, XSD, DOAP, FOAF, OWL
 from namespace import NamespaceManager, split_uri
 from graph_element import Node
-from utils import Config, SCHEMA
-
-
-query_classes = prepareQuery("""
-SELECT ?s {
-  { ?s a owl:Class } UNION
-  { ?s owl:subClassOf+ ?o . ?o a owl:Class . }
-} """, initNs={'owl': OWL})
-query_properties = prepareQuery("""
-SELECT ?s {
-  { ?s a ?property } UNION { ?s owl:subPropertyOf+ ?o . ?o a ?property }
-  FILTER ( ?property IN ( owl:DatatypeProperty, owl:ObjectProperty ) )
-} """, initNs={'owl': OWL})
+from utils import Config, SCHEMA, TYPE, LABEL, TOOLTIP, CLASS, SKIP
+from streaming import iter_triples, LINE_FORMATS
+from buffers import DiskSet
+from parallel import read_partials
+from cache import ParseCache
+from ontology_index import OntologyIndex, descendants
+from compact import TermTable, TermTupleTable
+from subgraph import Adjacency
+from inputs import parse_file
+from instrument import Profiler
+
+
 common_ns = {URIRef(ns) for ns in (RDF, RDFS, SKOS, SCHEMA, XSD, DOAP, FOAF)}
 
 
 class OntologyGraph:
-    def __init__(self, files, config, format='ttl', ontology=None):
+    def __init__(self, files, config, format='ttl', ontology=None, stream=False, jobs=1, cache=None,
+                 compact=False, profiler=None):
+        self.profiler = profiler
+        self.warnings = 0
         self.g = Graph()
         self.g.namespace_manager = NamespaceManager(self.g)
         if ontology is not None:
-            g = Graph()
-            self._load_files(g, ontology)
             self.ontology_defined = True
-            self.ontology_cls = {cls for cls, in g.query(query_classes)}
-            self.ontology_pty = {pty for pty, in g.query(query_properties)}
+            with self._stage('ontology'):
+                self.ontology_cls, self.ontology_pty = self._load_ontology(ontology, cache)
         else:
             self.ontology_defined = False
         self.config = config
-        self._load_files(self.g, files, format)
+        self.kinds = config.predicate_kinds()
+        self.colored = config.colored_classes()
+        self.readers = {
+            TYPE: self._read_type,
+            LABEL: self._read_label,
+            TOOLTIP: self._read_tooltip,
+            CLASS: self._read_class,
+            None: self._read_value,
+        }
         self.classes = set()
         self.instances = dict()
-        self.edges = set()
         self.labels = dict()
         self.tooltips = defaultdict(list)
-        self.literals = set()
-        self._read_graph()
+        self.label_cache = dict()
+        self.terms = TermTable() if compact else None
+        self.selection = None
+        self.positions = None
+        self.placeholders = []
+        self.adjacency_index = None
+        if compact:
+            # one shared object per distinct term, edges and literals as columns of term ids
+            self.edges = TermTupleTable(self.terms, 3)
+            self.literals = TermTupleTable(self.terms, 2)
+        elif stream:
+            # Edges and literals grow with the number of triples, keep them on disk
+            self.edges = DiskSet()
+            self.literals = DiskSet()
+        else:
+            self.edges = set()
+            self.literals = set()
+        if cache is not None and not stream:
+            with self._stage('read'):
+                self._read_cached(files, format, jobs, cache)
+        elif jobs > 1:
+            with self._stage('read'):
+                for _, partial in read_partials(files, format, config, jobs):
+                    self.merge(partial)
+        elif stream:
+            with self._stage('read') as record:
+                count = 0
+                for count, (s, p, o) in enumerate(iter_triples(files, format, self.g.namespace_manager), 1):
+                    self._read_triple(s, p, o)
+                record['triples'] = count
+        elif compact:
+            with self._stage('read') as record:
+                record['triples'] = self._read_files(files, format)
+        else:
+            with self._stage('parse') as record:
+                self._load_files(self.g, files, format)
+                record['triples'] = len(self.g)
+            with self._stage('read') as record:
+                self._read_graph()
+                record['triples'] = len(self.g)
+
+    def _stage(self, name):
+        if self.profiler is None:
+            return nullcontext({})
+        return self.profiler.stage(name)
+
+    def add_hook(self, hook):
+        """ Call hook(event, stage, record) when a stage starts and ends, see Profiler. """
+        if self.profiler is None:
+            self.profiler = Profiler()
+        self.profiler.add_hook(hook)
+
+    def report(self):
+        """ Profile of the run as a JSON serializable dict, together with counters of the graph. """
+        namespace_manager = self.g.namespace_manager
+        profiler = self.profiler if self.profiler is not None else Profiler()
+        return profiler.report(
+            counters=dict(profiler.counters,
+                          warnings=self.warnings,
+                          qname_cache_hits=namespace_manager.cache_hits,
+                          qname_cache_misses=namespace_manager.cache_misses,
+                          labels_computed=len(self.label_cache)),
+            graph={
+                'classes': len(self.classes),
+                'instances': len(self.instances),
+                'literals': len(self.literals),
+                'edges': len(self.edges),
+                'labels': len(self.labels),
+            })
+
+    def write_report(self, file):
+        """ Write the report as JSON to a path, or to stderr for '-' as stdout may carry the graph. """
+        if file == '-':
+            json.dump(self.report(), sys.stderr, indent=2)
+            sys.stderr.write('\n')
+        else:
+            with open(file, 'w') as f:
+                json.dump(self.report(), f, indent=2)
+
+    def _warn(self, message):
+        self.warnings += 1
+        print("[WARNING] " + message, file=sys.stderr)
+
+    def _load_ontology(self, ontology, cache=None):
+        if isinstance(ontology, OntologyIndex):
+            # copies, the sets are extended with every unknown class and property
+            return set(ontology.classes), set(ontology.properties)
+        if cache is not None and isinstance(ontology, str):
+            cached = cache.get(ontology, 'ontology')
+            if cached is not None:
+                return cached
+        if isinstance(ontology, str) and OntologyIndex.is_index(ontology):
+            index = OntologyIndex.load(ontology)
+        else:
+            index = OntologyIndex.from_files(ontology)
+        result = index.classes, index.properties
+        if cache is not None and isinstance(ontology, str):
+            cache.put(ontology, result, 'ontology')
+        return result
+
+    def _read_cached(self, files, format, jobs, cache):
+        if isinstance(files, str):
+            files = [files]
+        context = (format, self.config.fingerprint())
+        partials = {file: cache.get(file, *context) for file in files}
+        missing = [file for file, partial in partials.items() if partial is None]
+        if jobs > 1:
+            graphs = {}
+            for file, partial in read_partials(missing, format, self.config, jobs):
+                if file not in graphs:
+                    graphs[file] = OntologyGraph([], self.config, format)
+                graphs[file].merge(partial)
+            computed = {file: og.partial() for file, og in graphs.items()}
+        else:
+            computed = {file: OntologyGraph(file, self.config, format).partial() for file in missing}
+        for file in missing:
+            partials[file] = computed[file]
+            cache.put(file, computed[file], *context)
+        for file in files:
+            self.merge(partials[file])
 
     @staticmethod
     def _load_files(graph, files, format='ttl'):
         if isinstance(files, str):
             files = [files]
         for file in files:
-            graph.load(file, format=format)
+            parse_file(graph, file, format)
+
+    def _read_files(self, files, format='ttl'):
+        """ Read the files without keeping a Graph of the whole input. N-Triples and N-Quads
+        are read line by line, every other file through a Graph of its own dropped once read. """
+        if isinstance(files, str):
+            files = [files]
+        count = 0
+        for file in files:
+            if format.lower() in LINE_FORMATS:
+                triples = iter_triples(file, format)
+            else:
+                triples = Graph()
+                parse_file(triples, file, format)
+                for prefix, namespace in triples.namespaces():
+                    self.g.namespace_manager.bind(prefix, namespace, override=False)
+            for s, p, o in triples:
+                self._read_triple(s, p, o)
+                count += 1
+        return count
 
     def _read_graph(self):
         for s, p, o in self.g:
-            if any(uri in self.config.blacklist for uri in (s, p, o)):
-                continue
-            if p == RDF.type:
-                if o == OWL.Class:
-                    self.add_to_classes(s)
-                else:
-                    self.instances[s] = o
-                    if str(o) not in self.config.colors.ins:
-                        self.add_to_classes(o)
-                        self.add_edge((s, p, o))
-            elif p in self.config.label_property:
-                self.labels[s] = o
-            elif p in self.config.tooltip_property:
-                self.tooltips[s].append(o)
-            elif isinstance(o, Literal):
-                literal_id = uuid4().hex
+            self._read_triple(s, p, o)
+
+    def _read_triple(self, s, p, o):
+        kind = self.kinds.get(p)
+        if kind is SKIP:
+            return
+        blacklist = self.config.blacklist
+        if blacklist and (s in blacklist or o in blacklist):
+            return
+        if self.terms is not None:
+            s, p, o = self.terms.intern(s), self.terms.intern(p), self.terms.intern(o)
+        self.readers[kind](s, p, o)
+
+    def _read_type(self, s, p, o):
+        if o == OWL.Class:
+            self.add_to_classes(s)
+        else:
+            self.instances[s] = o
+            if o not in self.colored:
+                self.add_to_classes(o)
+                self.add_edge((s, p, o))
+
+    def _read_label(self, s, p, o):
+        self.labels[s] = o
+
+    def _read_tooltip(self, s, p, o):
+        self.tooltips[s].append(o)
+
+    def _read_class(self, s, p, o):
+        if not isinstance(o, Literal):
+            self.add_to_classes(o)
+        self._read_value(s, p, o)
+
+    def _read_value(self, s, p, o):
+        if isinstance(o, Literal):
+            if self.config.literal_mode == 'fold':
+                # formatted when drawn, the label of p may not have been read yet
+                self.tooltips[s].append((p, o))
+            else:
+                literal_id = self._literal_id(s, p, o)
                 self.literals.add((literal_id, o))
                 self.add_edge((s, p, literal_id))
-            else:
-                if p in self.config.class_inference_in_object:
-                    self.add_to_classes(o)
-                # if p in self.config.property_inference_in_object:
-                self.instances[o] = self.instances.get(o, None)
-                self.add_edge((s, p, o))
+        else:
+            # if p in self.config.property_inference_in_object:
+            self.instances[o] = self.instances.get(o, None)
+            self.add_edge((s, p, o))
+
+    def _literal_id(self, s, p, o):
+        # content based, so equal literals can share a node depending on
+        # config.literal_mode and a literal of an IRI subject keeps its id
+        # between runs, blank nodes get new names on every parse though
+        mode = self.config.literal_mode
+        key = (s, o) if mode == 'subject' else (o,) if mode == 'global' else (s, p, o)
+        return blake2b(' '.join(term.n3() for term in key).encode('utf-8'), digest_size=12).hexdigest()
+
+    def _folded_literal(self, p, o):
+        return '{}: {}'.format(self._pred_label(p), o)
+
+    def _tooltip(self, uri):
+        """ Tooltip text of a node, folded literals as "property: value". """
+        return ' '.join(self._folded_literal(*row) if isinstance(row, tuple) else row
+                        for row in self.tooltips.get(uri, ()))
+
+    def _folded_subjects(self):
+        """ Subjects of folded literals without a class or instance node, e.g. untyped ones. """
+        if self.config.literal_mode != 'fold':
+            return []
+        return [uri for uri, rows in self.tooltips.items() if uri not in self.classes and uri not in self.instances
+                and any(isinstance(row, tuple) for row in rows)]
+
+    def partial(self):
+        return {
+            'namespaces': list(self.g.namespaces()),
+            'classes': self.classes,
+            'instances': self.instances,
+            'edges': self.edges,
+            'labels': self.labels,
+            'tooltips': dict(self.tooltips),
+            'literals': self.literals,
+        }
+
+    def merge(self, partial):
+        self.label_cache.clear()
+        self.adjacency_index = None
+        for prefix, namespace in partial['namespaces']:
+            self.g.namespace_manager.bind(prefix, namespace, override=False)
+        for cls in partial['classes']:
+            self.add_to_classes(cls)
+        for instance, class_ in partial['instances'].items():
+            if class_ is not None or instance not in self.instances:
+                self.instances[instance] = class_
+        for triple in partial['edges']:
+            self.add_edge(triple)
+        self.labels.update(partial['labels'])
+        for uri, tooltips in partial['tooltips'].items():
+            self.tooltips[uri].extend(tooltips)
+        for literal in partial['literals']:
+            self.literals.add(literal)
 
     def add_to_classes(self, cls):
         if self.ontology_defined:
             if cls not in self.classes and cls not in self.ontology_cls:
-                print("[WARNING] Class {} doesn't exist in the ontology!".format(cls))
+                self._warn("Class {} doesn't exist in the ontology!".format(cls))
                 self.ontology_cls.add(cls)  # Only bark once
         self.classes.add(cls)
 
@@ -92,27 +320,143 @@ class OntologyGraph:
             if p not in self.ontology_pty:
                 prefix, _ = split_uri(p)
                 if URIRef(prefix) not in common_ns:
-                    print("[WARNING] Property {} doesn't exist in the ontology!".format(p))
+                    self._warn("Property {} doesn't exist in the ontology!".format(p))
                     self.ontology_pty.add(p)  # Only bark once
         self.edges.add(triple)
 
+    def adjacency(self):
+        """ Adjacency of the edges read so far, built on first use. """
+        if self.adjacency_index is None:
+            self.adjacency_index = Adjacency(self.edges, self.literals)
+        return self.adjacency_index
+
+    def _check_nodes(self, uris):
+        adjacency = self.adjacency()
+        for uri in uris:
+            if uri not in adjacency and uri not in self.classes and uri not in self.instances:
+                self._warn("{} doesn't exist in the graph!".format(uri))
+
+    def neighborhood(self, seeds, hops=1):
+        """ The seeds and every node within hops edges of them, in either direction. """
+        seeds = list(seeds)
+        self._check_nodes(seeds)
+        return self.adjacency().neighborhood(seeds, hops)
+
+    def hierarchy(self):
+        """ The classes, drawn with only the edges between them. """
+        return set(self.classes)
+
+    def instances_of(self, classes):
+        """ The classes, their subclasses and all their instances. """
+        classes = list(classes)
+        self._check_nodes(classes)
+        inc = self.adjacency().inc
+        children = {cls: [s for p, s in inc.get(cls, ()) if p in self.config.class_inference_in_object]
+                    for cls in self.classes}
+        classes = descendants(classes, children)
+        return classes | {instance for instance, class_ in self.instances.items() if class_ in classes}
+
+    def path(self, source, target):
+        """ Nodes of a shortest path between source and target, empty if there is none. """
+        self._check_nodes((source, target))
+        path = self.adjacency().path(source, target)
+        if path is None:
+            self._warn("There is no path between {} and {}!".format(source, target))
+            return set()
+        return set(path)
+
+    def select(self, nodes):
+        """ Only draw these nodes and the edges between them, None draws everything. """
+        self.selection = None if nodes is None else set(nodes)
+        self.placeholders = []
+
+    def budget(self, max_nodes=None, max_edges=None, time_budget=None, by='degree'):
+        """ Only draw the most important nodes within the caps, see budget.rank for the orders.
+        The pruned instances of a drawn class are counted into one "+N more" node next to the
+        class, the other pruned nodes into one more. time_budget caps the size at what dot lays out in about that many
+        seconds, see budget.DOT_ELEMENTS_PER_SECOND. """
+        from budget import rank, plan, DOT_ELEMENTS_PER_SECOND
+        self.placeholders = []
+        nodes, _ = self._graph_ids()
+        adjacency = self.adjacency()
+        order = rank(adjacency, nodes, self.classes, by)
+        max_elements = None if time_budget is None else int(time_budget * DOT_ELEMENTS_PER_SECOND)
+        kept, pruned = plan(order, adjacency, self.instances.get, max_nodes, max_edges, max_elements)
+        self.select(kept)
+        self.placeholders = [('more:{}'.format(class_ if class_ is not None else ''), count, class_)
+                             for class_, count in sorted(pruned.items(), key=lambda item: str(item[0]))]
+
+    def _selected(self):
+        folded = self._folded_subjects()
+        if self.selection is None:
+            instances = self.instances.items()
+            if folded:
+                instances = list(instances) + [(uri, None) for uri in folded]
+            return self.classes, instances, self.literals
+        literals = self.adjacency().literals
+        return ([uri for uri in self.selection if uri in self.classes],
+                [(uri, self.instances[uri]) for uri in self.selection if uri in self.instances]
+                + [(uri, None) for uri in folded if uri in self.selection],
+                [(uri, literals[uri]) for uri in self.selection if uri in literals])
+
+    def _graph_ids(self):
+        """ Ids of the drawn nodes, including edge ends without a node line, and (source, target) pairs. """
+        classes, instances, literals = self._selected()
+        nodes = list(dict.fromkeys(chain(classes, (uri for uri, _ in instances), (uri for uri, _ in literals))))
+        edges = [(s, o) for s, _, o in self._selected_edges()]
+        index = {uri: i for i, uri in enumerate(nodes)}
+        for pair in edges:
+            for uri in pair:
+                if uri not in index:
+                    index[uri] = len(nodes)
+                    nodes.append(uri)
+        for uri, _, class_ in self.placeholders:
+            index[uri] = len(nodes)
+            nodes.append(uri)
+            if class_ is not None:
+                edges.append((uri, class_))
+        return nodes, [(index[s], index[o]) for s, o in edges]
+
+    def layout(self, iterations=100, seed=0, spacing=1.0):
+        """ Place the nodes with the built-in force directed layout, spacing inches apart on average.
+        The dot output then carries the positions, render it with neato -n2. """
+        from layout import force_layout
+        with self._stage('layout'):
+            nodes, edges = self._graph_ids()
+            positions = force_layout(len(nodes), edges, iterations, seed) * (72 * spacing)
+            self.positions = dict(zip(nodes, positions.tolist()))
+
     def convert(self):
-        node_strings = []
-        edge_strings = []
-        for class_ in self.classes:
-            node_strings.append(self._dot_class_node(class_))
-        for instance, class_ in self.instances.items():
-            node_strings.append(self._dot_instance_node(instance, class_))
-        for uri, literal in self.literals:
-            node = Node(uri, node_color(self.config.colors.lit))
-            node.update({
-                "label": text_justify(literal, self.config.max_label_length),
-                "shape": "rect"
-            })
-            node_strings.append(node.to_draw())
-        for s, p, o in self.edges:
-            edge_strings.append('  "{}" -> "{}" [label="{}"]'.format(s, o, self._pred_label(p)))
-        return node_strings, edge_strings
+        return list(self.iter_nodes()), list(self.iter_edges())
+
+    def iter_nodes(self):
+        classes, instances, literals = self._selected()
+        nodes = (uri for uri in chain(classes, (instance for instance, _ in instances)) if not self._is_blank(uri))
+        with self._stage('labels'):
+            self.compute_labels(nodes, self.config.max_label_length)
+        for class_ in classes:
+            yield self._dot_class_node(class_)
+        for instance, class_ in instances:
+            yield self._dot_instance_node(instance, class_)
+        for uri, literal in literals:
+            yield self._dot_literal_node(uri, literal)
+        for uri, count, _ in self.placeholders:
+            node = Node(uri)
+            node.update({"label": "+{} more".format(count), "shape": "rect", "style": "dashed"})
+            yield node.to_draw()
+
+    def _selected_edges(self):
+        return self.edges if self.selection is None else self.adjacency().edges_within(self.selection)
+
+    def iter_edges(self):
+        for s, p, o in self._selected_edges():
+            yield self._dot_edge(s, p, o)
+        for uri, _, class_ in self.placeholders:
+            if class_ is not None:
+                yield '  "{}" -> "{}" [style="dashed"]'.format(uri, class_)
+
+    def _dot_edge(self, s, p, o):
+        return '  "{}" -> "{}" [label="{}"]'.format(s, o, self._pred_label(p))
 
     def _dot_class_node(self, class_):
         color = node_color(self.config.get_cls_color(class_))
@@ -122,11 +466,20 @@ class OntologyGraph:
         color = node_color(self.config.get_ins_color(class_))
         return self._dot_node(instance, color)
 
+    def _dot_literal_node(self, uri, literal, attrs=None):
+        node = Node(uri, style=attrs or node_color(self.config.colors.lit))
+        node.update({
+            "label": text_justify(literal, self.config.max_label_length),
+            "shape": "rect"
+        })
+        return node.to_draw()
+
     def _dot_node(self, uri, attrs):
-        node = Node(uri, attrs)
-        if self.tooltips[uri]:
-            node.update({"tooltip": " ".join(self.tooltips[uri])})
-        if isinstance(uri, BNode) or self.config.bnode_regex_match(uri):
+        node = Node(uri, style=attrs)
+        tooltip = self._tooltip(uri)
+        if tooltip:
+            node.update({"tooltip": tooltip})
+        if self._is_blank(uri):
             node.update({
                 "label": "",
                 "shape": "circle"
@@ -137,8 +490,11 @@ class OntologyGraph:
         })
         return node.to_draw()
 
+    def _is_blank(self, uri):
+        return isinstance(uri, BNode) or self.config.bnode_regex_match(uri)
+
     @classmethod
-    def generate_dotstring(cls, node_strings, edge_strings, fill):
+    def dot_header(cls, fill):
         dot = [
             'digraph G {',
             '  rankdir=BT'
@@ -147,15 +503,28 @@ class OntologyGraph:
             dot.append('  node[style="filled" height=.3]')
         else:
             dot.append('  node[height=.3]')
+        return dot
+
+    @classmethod
+    def generate_dotstring(cls, node_strings, edge_strings, fill):
+        dot = cls.dot_header(fill)
         dot.extend(node_strings)
         dot.extend(edge_strings)
         dot.append('}')
         return '\n'.join(dot)
 
+    def iter_dot(self):
+        yield from self.dot_header(self.config.colors.filled)
+        yield from self.iter_nodes()
+        if self.positions is not None:
+            for uri, (x, y) in self.positions.items():
+                yield '"{}" [pos="{:.1f},{:.1f}"]'.format(uri, x, y)
+        yield from self.iter_edges()
+        yield '}'
+
     def generate(self):
-        nodes, edges = self.convert()
-        dot = self.generate_dotstring(nodes, edges, self.config.colors.filled)
-        return dot
+        with self._stage('emit'):
+            return '\n'.join(self.iter_dot())
 
     def graph(self, format='svg'):
         try:
@@ -169,17 +538,76 @@ class OntologyGraph:
         graph.format = format
         return graph
 
+    def render(self, format='svg', output=None, engine='dot', options=()):
+        """ Lay out the graph with graphviz, writing the dot text into its stdin while it is generated.
+        The result goes to output if given, otherwise it is returned as bytes. """
+        command = [engine, '-T' + format] + list(options) + (['-o', output] if output else [])
+        with self._stage('render'), tempfile.TemporaryFile() as errors:
+            try:
+                process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=errors,
+                                           stdout=subprocess.DEVNULL if output else subprocess.PIPE)
+            except FileNotFoundError:
+                raise FileNotFoundError("Graphviz {} executable not found.\n"
+                                        "Please install graphviz or use write_file function to save dot file "
+                                        "and generate the graph manually.".format(engine))
+            failures = []
+            writer = threading.Thread(target=self._feed, args=(process.stdin, failures))
+            writer.start()
+            result = None if output else process.stdout.read()
+            writer.join()
+            process.wait()
+            if failures:
+                # graphviz only saw part of the graph, its output and exit status are beside the point
+                if output and os.path.isfile(output):
+                    os.remove(output)
+                raise failures[0]
+            if process.returncode:
+                errors.seek(0)
+                raise subprocess.CalledProcessError(process.returncode, command, result, errors.read())
+        return result
+
+    def _feed(self, stdin, failures):
+        try:
+            with io.TextIOWrapper(stdin, encoding='utf-8') as f:
+                self._write_lines(f)
+        except BrokenPipeError:
+            pass  # graphviz stopped early, its exit status tells why
+        except BaseException as e:
+            failures.append(e)  # raised again by render
+
     def write_file(self, file):
-        dot = self.generate()
-        with open(file, 'w') as f:
-            f.write(dot)
+        """ Write the dot text to a path, to stdout for '-', gzip compressed for *.gz, or to a file object. """
+        with open_output(file) as f:
+            self._write_lines(f)
+
+    def export(self, file, format='json'):
+        """ Write the drawn nodes and edges as json, ndjson, graphml or cytoscape, see export.EXPORTERS.
+        file is handled like in write_file. """
+        from export import EXPORTERS
+        if format not in EXPORTERS:
+            raise ValueError("Can't export {}, use one of {}".format(format, ', '.join(sorted(EXPORTERS))))
+        with self._stage('export'), open_output(file) as f:
+            EXPORTERS[format](self, f)
+
+    def _write_lines(self, f):
+        with self._stage('emit'):
+            lines = self.iter_dot()
+            f.write(next(lines))
+            for line in lines:
+                f.write('\n')
+                f.write(line)
 
     pred_map = {RDF.type: 'a'}
 
     def _pred_label(self, uri):
-        return self.pred_map.get(uri, self.compute_label(uri, 0))
+        if uri in self.pred_map:
+            return self.pred_map[uri]
+        return self.compute_label(uri, 0)
 
     def compute_label(self, uri, length=20):
+        key = (uri, length)
+        if key in self.label_cache:
+            return self.label_cache[key]
         if uri in self.labels:
             label = self.labels[uri]
         else:
@@ -187,10 +615,39 @@ class OntologyGraph:
             label = '{}:{}'.format(prefix, name) if prefix else name
         if length and len(label) > length:
             label = label[:length-3] + '...'
+        self.label_cache[key] = label
         return label
 
+    def compute_labels(self, uris, length=20):
+        """ Labels of all distinct uris. They are resolved in sorted order, so the URIs
+        of a namespace are handled one after another and every label once. """
+        return {uri: self.compute_label(uri, length) for uri in sorted(set(uris))}
+
+
+@contextmanager
+def open_output(file):
+    """ A text file for a path, stdout for '-', gzip compressed for *.gz, or file itself if it is a file object.
+    A path is removed again if writing fails, rather than left truncated. """
+    if hasattr(file, 'write'):
+        yield file
+    elif file == '-':
+        yield sys.stdout
+        sys.stdout.write('\n')
+        sys.stdout.flush()
+    else:
+        try:
+            with gzip.open(file, 'wt', encoding='utf-8') if file.endswith('.gz') \
+                    else open(file, 'w', buffering=1 << 20) as f:
+                yield f
+        except BaseException:
+            if os.path.isfile(file):  # not e.g. /dev/null
+                os.remove(file)
+            raise
+
 
+@lru_cache(maxsize=None)
 def node_color(color):
+    # shared by all nodes of a color, see Element.style
     return {
         "fillcolor": color,
         "color": color
@@ -222,8 +679,154 @@ if __name__ == '__main__':
                         help='Provided ontology for the graph.')
     parser.add_argument('-C', '--config', dest='config', default=None,
                         help='Provided configuration.')
+    parser.add_argument('-s', '--stream', dest='stream', action='store_true',
+                        help='Stream N-Triples/N-Quads/Turtle input instead of loading it into memory.')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=1,
+                        help='Number of worker processes used to parse the input files.')
+    parser.add_argument('--cache-dir', dest='cache_dir', default=None,
+                        help='Directory caching the parsed input and ontology files between runs.')
+    parser.add_argument('--cache-size', dest='cache_size', type=int, default=1024,
+                        help='Maximum size of the cache directory in MB.')
+    parser.add_argument('-w', '--watch', dest='watch', action='store_true',
+                        help='Keep running and update the output whenever an input file changes.')
+    parser.add_argument('-T', '--render', dest='render', default=None,
+                        help='Render the graph in this format (e.g. svg, png) with graphviz instead of writing dot.')
+    parser.add_argument('--compact', dest='compact', action='store_true',
+                        help='Intern terms and keep edges as integer columns to save memory on large graphs.')
+    parser.add_argument('--seed', dest='seeds', action='append', default=[],
+                        help='Only draw the neighborhood of this URI. Can be repeated.')
+    parser.add_argument('--hops', dest='hops', type=int, default=1,
+                        help='Number of edges around the --seed URIs to include.')
+    parser.add_argument('--hierarchy', dest='hierarchy', action='store_true',
+                        help='Only draw the classes and the edges between them.')
+    parser.add_argument('--instances-of', dest='instances_of', action='append', default=[],
+                        help='Only draw this class, its subclasses and their instances. Can be repeated.')
+    parser.add_argument('--path', dest='paths', nargs=2, action='append', default=[], metavar=('FROM', 'TO'),
+                        help='Only draw a shortest path between two URIs. Can be repeated.')
+    parser.add_argument('--summary', dest='summary', action='store_true',
+                        help='Draw one node per class with its number of instances and count the edges between classes.')
+    parser.add_argument('--layout', dest='layout', action='store_true',
+                        help='Place the nodes with the built-in force directed layout (needs numpy). '
+                             'The dot output carries the positions and -T renders it with neato -n2.')
+    parser.add_argument('--layout-iterations', dest='layout_iterations', type=int, default=100,
+                        help='Number of iterations of --layout.')
+    parser.add_argument('--shard', dest='shard', default=None, choices=('component', 'namespace', 'class'),
+                        help='Write one dot file per connected component, namespace or top-level class into the '
+                             '-o directory. With -T they are rendered in -j graphviz processes at once.')
+    parser.add_argument('--shard-min-size', dest='shard_min_size', type=int, default=1,
+                        help='Pack shards with fewer nodes than this together.')
+    parser.add_argument('--index', dest='index', action='store_true',
+                        help='With --shard, also write an index.html linking the shards.')
+    parser.add_argument('-e', '--export', dest='export', default=None,
+                        choices=('json', 'ndjson', 'cytoscape', 'graphml'),
+                        help='Write the nodes and edges to -o as node-link JSON, NDJSON, Cytoscape.js JSON or '
+                             'GraphML instead of dot.')
+    parser.add_argument('--tiles', dest='tiles', action='store_true',
+                        help='Write a quadtree of tiles at several zoom levels and a manifest.json into the -o '
+                             'directory. Positions come from --layout, otherwise from graphviz dot.')
+    parser.add_argument('--tile-levels', dest='tile_levels', type=int, default=4,
+                        help='Number of zoom levels of --tiles.')
+    parser.add_argument('--tile-format', dest='tile_format', default='svg', choices=('svg', 'png'),
+                        help='Format of the --tiles tiles, png needs cairosvg.')
+    parser.add_argument('--diff', dest='diff', action='append', default=[],
+                        help='Only draw what changed from this old version of the input files to the input files. '
+                             'Can be repeated.')
+    parser.add_argument('--context', dest='context', type=int, default=1,
+                        help='Number of edges around the changes of --diff to draw.')
+    parser.add_argument('--max-nodes', dest='max_nodes', type=int, default=None,
+                        help='Only draw this many of the most important nodes, the rest is counted into '
+                             '"+N more" nodes per class.')
+    parser.add_argument('--max-edges', dest='max_edges', type=int, default=None,
+                        help='Only draw the most important nodes with at most this many edges between them.')
+    parser.add_argument('--time-budget', dest='time_budget', type=float, default=None,
+                        help='Only draw as many of the most important nodes as dot lays out in about this many '
+                             'seconds.')
+    parser.add_argument('--rank', dest='rank', default='degree', choices=('degree', 'class', 'pagerank'),
+                        help='How --max-nodes, --max-edges and --time-budget pick the nodes: by number of edges, '
+                             'classes first, or by PageRank.')
+    parser.add_argument('--profile', dest='profile', default=None,
+                        help='Write a JSON report of the time spent in every stage and of graph counters to this '
+                             'file, - for stderr.')
+    parser.add_argument('--profile-memory', dest='profile_memory', action='store_true',
+                        help='Also trace the allocations of every stage in --profile, which slows the run down.')
     args = parser.parse_args()
+    selecting = args.seeds or args.hierarchy or args.instances_of or args.paths
+    if selecting and args.watch:
+        parser.error('--seed, --hierarchy, --instances-of and --path can not be used with -w')
+    if args.watch and (args.layout or args.render or args.stream or args.jobs > 1 or args.compact
+                       or args.cache_dir):
+        parser.error('--layout, -T, -s, -j, --compact and --cache-dir can not be used with -w')
+    if args.diff and (selecting or args.watch or args.summary):
+        parser.error('--diff can not be used with -w, --summary or a selection')
+    if args.export and (args.render or args.summary or args.shard or args.layout or args.watch):
+        parser.error('--export can not be used with -T, --summary, --shard, --layout or -w')
+    if args.tiles and (args.render or args.export or args.summary or args.shard or args.watch):
+        parser.error('--tiles can not be used with -T, --export, --summary, --shard or -w')
+    budgeted = args.max_nodes is not None or args.max_edges is not None or args.time_budget is not None
+    if budgeted and (args.watch or args.summary or args.shard):
+        parser.error('--max-nodes, --max-edges and --time-budget can not be used with -w, --summary or --shard')
+    if args.profile and args.watch:
+        parser.error('--profile can not be used with -w')
+    if args.summary and (selecting or args.watch):
+        parser.error('--summary can not be used with -w or a selection')
+    if args.shard and (args.watch or args.summary or args.layout):
+        parser.error('--shard can not be used with -w, --summary or --layout')
 
+    profiler = Profiler(args.profile_memory) if args.profile else None
     config = Config(args.config)
-    og = OntologyGraph(args.files, config, args.format, ontology=args.ontology)
-    og.write_file(args.out)
+    cache = ParseCache(args.cache_dir, args.cache_size << 20) if args.cache_dir else None
+    if args.watch:
+        from watch import IncrementalOntologyGraph, watch
+        og = IncrementalOntologyGraph(args.files, config, args.format, ontology=args.ontology, cache=cache)
+        watch(og, args.files, args.out)
+    if args.diff:
+        from diff import DiffGraph
+        og = DiffGraph(args.diff, args.files, config, args.format, ontology=args.ontology, stream=args.stream,
+                       jobs=args.jobs, cache=cache, compact=args.compact, profiler=profiler, context=args.context)
+        summary = og.summary()
+        print("[DIFF] nodes +{added} -{removed} ~{changed}".format(**summary['nodes']),
+              "edges +{added} -{removed}".format(**summary['edges']), file=sys.stderr)
+    else:
+        graph_class = OntologyGraph
+        if args.summary:
+            from summary import SummaryGraph
+            graph_class = SummaryGraph
+        og = graph_class(args.files, config, args.format, ontology=args.ontology, stream=args.stream,
+                         jobs=args.jobs, cache=cache, compact=args.compact, profiler=profiler)
+    if selecting:
+        selection = set()
+        if args.seeds:
+            selection |= og.neighborhood(map(URIRef, args.seeds), args.hops)
+        if args.hierarchy:
+            selection |= og.hierarchy()
+        if args.instances_of:
+            selection |= og.instances_of(map(URIRef, args.instances_of))
+        for source, target in args.paths:
+            selection |= og.path(URIRef(source), URIRef(target))
+        og.select(selection)
+    if budgeted:
+        og.budget(args.max_nodes, args.max_edges, args.time_budget, args.rank)
+    if args.layout:
+        og.layout(args.layout_iterations)
+    if args.shard:
+        from shard import shard, write_shards, render_shards, write_index
+        shards = shard(og, args.shard, args.shard_min_size)
+        outputs = write_shards(og, shards, args.out)
+        if args.render:
+            outputs = render_shards(outputs, args.render, args.jobs)
+        if args.index:
+            write_index(args.out, shards, outputs)
+    elif args.tiles:
+        from tiles import write_tiles, plain_positions
+        positions = og.positions if args.layout else plain_positions(og.render('plain').decode('utf-8'))
+        write_tiles(og, positions, args.out, args.tile_levels, format=args.tile_format)
+    elif args.export:
+        og.export(args.out, args.export)
+    elif args.render and args.layout:
+        og.render(args.render, args.out, 'neato', ['-n2'])
+    elif args.render:
+        og.render(args.render, args.out)
+    else:
+        og.write_file(args.out)
+    if args.profile:
+        og.write_report(args.profile)
@@ -0,0 +1,51 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from streaming import LINE_FORMATS, iter_line_range, split_lines
+from inputs import compression
+
+
+__all__ = ['read_partials', 'make_tasks']
+
+
+MIN_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def make_tasks(files, format, jobs, min_chunk_size=MIN_CHUNK_SIZE):
+    """ One task per file, uncompressed N-Triples/N-Quads files larger than min_chunk_size
+    are further split on line boundaries into up to jobs ranges. """
+    if isinstance(files, str):
+        files = [files]
+    tasks = []
+    for file in files:
+        size = os.path.getsize(file)
+        if format in LINE_FORMATS and size > min_chunk_size and compression(file) is None:
+            parts = min(jobs, size // min_chunk_size + 1)
+            tasks.extend((file, format, start, end) for start, end in split_lines(file, parts))
+        else:
+            tasks.append((file, format, 0, None))
+    return tasks
+
+
+def _read_task(task, config):
+    from ontology_viz import OntologyGraph
+    file, format, start, end = task
+    og = OntologyGraph([], config, format)
+    if format in LINE_FORMATS:
+        for s, p, o in iter_line_range(file, format, start, end):
+            og._read_triple(s, p, o)
+    else:
+        og._load_files(og.g, file, format)
+        og._read_graph()
+    return og.partial()
+
+
+def read_partials(files, format, config, jobs, min_chunk_size=MIN_CHUNK_SIZE):
+    """ Parse and classify the files in jobs worker processes, yielding the file and
+    the partial result of OntologyGraph.partial for every task in order. A file
+    split into line ranges yields several partial results. """
+    tasks = make_tasks(files, format, jobs, min_chunk_size)
+    if not tasks:
+        return
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+        partials = executor.map(_read_task, tasks, [config] * len(tasks))
+        yield from zip((file for file, _, _, _ in tasks), partials)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+import argparse
+import json
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ontology_viz import OntologyGraph
+from ontology_index import OntologyIndex
+from cache import ParseCache
+from inputs import PARSE_ERRORS
+from utils import Config
+
+
+__all__ = ['RenderService', 'serve']
+
+
+CONTENT_TYPES = {
+    'svg': 'image/svg+xml',
+    'png': 'image/png',
+    'pdf': 'application/pdf',
+    'dot': 'text/vnd.graphviz',
+}
+
+
+class RenderError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _InFlight:
+    """ A render in progress, with its result or error once it is done. """
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class LRUCache:
+    """ Thread safe mapping of rendered outputs bounded by their total size in bytes. """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.items.get(key)
+            if value is not None:
+                self.items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            if key in self.items:
+                self.size -= len(self.items.pop(key))
+            self.items[key] = value
+            self.size += len(value)
+            while self.size > self.max_size and len(self.items) > 1:
+                _, evicted = self.items.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class RenderService:
+    """ Renders requests with warm configs and ontologies, a bounded dot worker pool and a result cache.
+
+    Identical requests arriving while one is being rendered wait for that render
+    instead of starting another one. """
+    def __init__(self, workers=4, queue_size=16, timeout=120, cache_size=256 << 20, parse_cache=None):
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        self.timeout = timeout
+        self.results = LRUCache(cache_size)
+        self.parse_cache = parse_cache
+        self.configs = {}
+        self.ontologies = {}
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _stat(file):
+        try:
+            stat = os.stat(file)
+        except OSError:
+            raise RenderError(404, "{} doesn't exist".format(file))
+        return stat.st_size, stat.st_mtime_ns
+
+    def _warm(self, store, file, load):
+        key = (os.path.abspath(file),) + self._stat(file)
+        with self.lock:
+            value = store.get(key)
+        if value is None:
+            value = load(file)
+            with self.lock:
+                store[key] = value
+        return value
+
+    def config(self, file):
+        return self._warm(self.configs, file, Config) if file else Config()
+
+    def ontology(self, file):
+        if not file:
+            return None
+        return self._warm(self.ontologies, file, lambda f: OntologyIndex.load(f) if OntologyIndex.is_index(f)
+                          else OntologyIndex.from_files(f))
+
+    def request_key(self, files, format, input_format, config, ontology):
+        digest = sha256()
+        digest.update('{}\0{}\0'.format(format, input_format).encode('utf-8'))
+        for file in list(files) + [config or '', ontology or '']:
+            digest.update(file.encode('utf-8') + b'\0')
+            if file:
+                with open(file, 'rb') as f:
+                    for block in iter(lambda: f.read(1 << 20), b''):
+                        digest.update(block)
+        return digest.hexdigest()
+
+    def render(self, files, format='svg', input_format='ttl', config=None, ontology=None):
+        if format not in CONTENT_TYPES:
+            raise RenderError(400, "Unsupported output format {}".format(format))
+        if not files:
+            raise RenderError(400, "No input files")
+        for file in list(files) + [config, ontology]:
+            if file:
+                self._stat(file)
+        key = self.request_key(files, format, input_format, config, ontology)
+        result = self.results.get(key)
+        if result is not None:
+            return result
+        with self.lock:
+            flight = self.in_flight.get(key)
+            owner = flight is None
+            if owner:
+                flight = self.in_flight[key] = _InFlight()
+        if not owner:
+            if not flight.event.wait(self.timeout):
+                raise RenderError(504, "Rendering timed out")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            og = OntologyGraph(files, self.config(config), input_format, ontology=self.ontology(ontology),
+                               cache=self.parse_cache)
+            dot = og.generate()
+            flight.result = dot.encode('utf-8') if format == 'dot' else self.layout(dot, format)
+            self.results.put(key, flight.result)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+            flight.event.set()
+
+    def layout(self, dot, format):
+        if not self.slots.acquire(blocking=False):
+            raise RenderError(503, "Too many pending renders")
+        try:
+            future = self.pool.submit(self._dot, dot, format)
+            return future.result()
+        finally:
+            self.slots.release()
+
+    def _dot(self, dot, format):
+        try:
+            process = subprocess.run(['dot', '-T' + format], input=dot.encode('utf-8'),
+                                     stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            raise RenderError(504, "Rendering timed out")
+        except FileNotFoundError:
+            raise RenderError(500, "Graphviz dot executable not found")
+        if process.returncode:
+            raise RenderError(500, process.stderr.decode('utf-8', 'replace'))
+        return process.stdout
+
+
+def make_handler(service):
+    class RenderHandler(BaseHTTPRequestHandler):
+        def _send(self, status, body, content_type='text/plain; charset=utf-8'):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if self.path != '/render':
+                return self._send(404, b'Not found')
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                format = request.get('format', 'svg')
+                body = service.render(request['files'], format, request.get('input_format', 'ttl'),
+                                      request.get('config'), request.get('ontology'))
+            except RenderError as e:
+                return self._send(e.status, str(e).encode('utf-8'))
+            except PARSE_ERRORS + (ValueError, KeyError, TypeError) as e:
+                return self._send(400, 'Bad request: {}'.format(e).encode('utf-8'))
+            except Exception as e:
+                self.log_error('Rendering failed: %r', e)
+                return self._send(500, 'Internal error: {}'.format(e).encode('utf-8'))
+            self._send(200, body, CONTENT_TYPES[format])
+
+    return RenderHandler
+
+
+def serve(service, host='127.0.0.1', port=8000):
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.pool.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve rendered ontology graphs over HTTP. '
+                                                 'POST /render {"files": [...], "format": "svg", '
+                                                 '"config": ..., "ontology": ...}')
+    parser.add_argument('--host', dest='host', default='127.0.0.1', help='Address to listen on.')
+    parser.add_argument('-p', '--port', dest='port', type=int, default=8000, help='Port to listen on.')
+    parser.add_argument('--workers', dest='workers', type=int, default=4, help='Number of concurrent dot layouts.')
+    parser.add_argument('--queue', dest='queue', type=int, default=16,
+                        help='Number of layouts allowed to wait for a worker.')
+    parser.add_argument('--timeout', dest='timeout', type=int, default=120, help='Layout timeout in seconds.')
+    parser.add_argument('--result-cache-size', dest='result_cache_size', type=int, default=256,
+                        help='Size of the rendered output cache in MB.')
+    parser.add_argument('--cache-dir', dest='cache_dir', default=None,
+                        help='Directory caching the parsed input files.')
+    args = parser.parse_args()
+
+    parse_cache = ParseCache(args.cache_dir) if args.cache_dir else None
+    serve(RenderService(args.workers, args.queue, args.timeout, args.result_cache_size << 20, parse_cache),
+          args.host, args.port)
@@ -0,0 +1,213 @@
+import html
+import os
+import re
+import subprocess
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from ontology_index import descendants
+from namespace import split_uri
+
+
+__all__ = ['shard', 'write_shards', 'render_shards', 'write_index', 'SHARD_MODES']
+
+
+SHARD_MODES = ('component', 'namespace', 'class')
+OTHER = 'other'
+
+
+def shard(og, by='component', min_size=1):
+    """ Partition the drawn nodes of og into {name: nodes}, largest shard first.
+
+    by='component' makes one shard per weakly connected component, 'namespace'
+    one per namespace of the node URIs and 'class' one per top-level class with
+    its subclasses and their instances. Blank nodes and literals go with a node
+    they are connected to. Shards smaller than min_size are packed together. """
+    if by not in SHARD_MODES:
+        raise ValueError("Can't shard by {}, use one of {}".format(by, ', '.join(SHARD_MODES)))
+    nodes, edges = og._graph_ids()
+    if by == 'component':
+        shards = _components(nodes, edges)
+    elif by == 'namespace':
+        shards = _namespaces(og, nodes, edges)
+    else:
+        shards = _class_trees(og, nodes, edges)
+    shards = sorted(shards.items(), key=lambda item: len(item[1]), reverse=True)
+    if min_size > 1:
+        shards = _pack(shards, min_size)
+    return dict(shards)
+
+
+def _components(nodes, edges):
+    parent = list(range(len(nodes)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for s, o in edges:
+        s, o = find(s), find(o)
+        if s != o:
+            parent[s] = o
+    groups = defaultdict(set)
+    for i, uri in enumerate(nodes):
+        groups[find(i)].add(uri)
+    groups = sorted(groups.values(), key=len, reverse=True)
+    return {'component-{}'.format(i + 1): group for i, group in enumerate(groups)}
+
+
+def _attach(groups, keys, nodes, edges):
+    """ Give the nodes without a key the key of a neighbor, spreading along the edges. """
+    neighbors = defaultdict(list)
+    for s, o in edges:
+        neighbors[s].append(o)
+        neighbors[o].append(s)
+    frontier = [i for i in range(len(nodes)) if keys[i] is not None]
+    while frontier:
+        reached = []
+        for i in frontier:
+            for j in neighbors[i]:
+                if keys[j] is None:
+                    keys[j] = keys[i]
+                    reached.append(j)
+        frontier = reached
+    for i, uri in enumerate(nodes):
+        groups[keys[i] if keys[i] is not None else OTHER].add(uri)
+    return groups
+
+
+def _namespaces(og, nodes, edges):
+    keys = []
+    for uri in nodes:
+        try:
+            keys.append(None if og._is_blank(uri) or uri in og.adjacency().literals else split_uri(uri)[0])
+        except ValueError:
+            keys.append(None)
+    groups = _attach(defaultdict(set), keys, nodes, edges)
+    prefixes = {str(namespace): prefix for prefix, namespace in og.g.namespaces()}
+    return {prefixes.get(namespace) or namespace: group for namespace, group in groups.items()}
+
+
+def _class_trees(og, nodes, edges):
+    drawn = set(nodes)
+    inc = og.adjacency().inc
+    inference = og.config.class_inference_in_object
+    children = {cls: [s for p, s in inc.get(cls, ()) if p in inference and s in og.classes] for cls in og.classes}
+    has_parent = {child for subclasses in children.values() for child in subclasses}
+    members = defaultdict(list)
+    for instance, class_ in og.instances.items():
+        if class_ is not None:
+            members[class_].append(instance)
+    groups = defaultdict(set)
+    for root in sorted(og.classes - has_parent):
+        if root not in drawn:
+            continue
+        tree = descendants([root], children)
+        group = {uri for uri in tree if uri in drawn}
+        group.update(instance for cls in tree for instance in members.get(cls, ()) if instance in drawn)
+        groups[og.compute_label(root, 0)] |= group
+    covered = set().union(*groups.values())
+    for group in groups.values():
+        # literals and blank nodes follow the class tree of the node they hang off
+        group |= _hanging(og, group, covered)
+    others = drawn.difference(*groups.values())
+    if others:
+        groups[OTHER] = others
+    return groups
+
+
+def _hanging(og, group, covered):
+    out = og.adjacency().out
+    literals = og.adjacency().literals
+    reached = set()
+    stack = list(group)
+    while stack:
+        for _, o in out.get(stack.pop(), ()):
+            if o not in covered and o not in reached and (o in literals or og._is_blank(o)):
+                reached.add(o)
+                stack.append(o)
+    return reached
+
+
+def _pack(shards, min_size):
+    """ Merge the shards smaller than min_size into bins of at least min_size nodes. """
+    packed, bin_ = [], set()
+    for name, nodes in shards:
+        if len(nodes) >= min_size:
+            packed.append((name, nodes))
+            continue
+        bin_ |= nodes
+        if len(bin_) >= min_size:
+            packed.append(('packed-{}'.format(len(packed) + 1), bin_))
+            bin_ = set()
+    if bin_:
+        packed.append(('packed-{}'.format(len(packed) + 1), bin_))
+    return packed
+
+
+def _file_name(name):
+    return re.sub(r'[^\w.-]+', '_', name).strip('_') or 'shard'
+
+
+def write_shards(og, shards, directory):
+    """ Write one dot file per shard into directory. Returns {name: path}. """
+    os.makedirs(directory, exist_ok=True)
+    selection = og.selection
+    paths = {}
+    used = set()
+    suffixes = {}  # last number tried per name, so clashing names count up from there
+    try:
+        for name, nodes in shards.items():
+            base = file_name = _file_name(name)
+            number = suffixes.get(base, 1)
+            while file_name in used:
+                number += 1
+                file_name = '{}-{}'.format(base, number)
+            suffixes[base] = number
+            used.add(file_name)
+            path = os.path.join(directory, file_name + '.dot')
+            og.select(nodes)
+            og.write_file(path)
+            paths[name] = path
+    finally:
+        og.selection = selection
+    return paths
+
+
+def _render(engine, format, path):
+    output = os.path.splitext(path)[0] + '.' + format
+    command = [engine, '-T' + format, '-o', output, path]
+    try:
+        process = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise FileNotFoundError("Graphviz {} executable not found.\n"
+                                "Please install graphviz or render the dot files manually.".format(engine))
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, command, None, process.stderr)
+    return output
+
+
+def render_shards(paths, format='svg', jobs=None, engine='dot'):
+    """ Render the dot files of write_shards with up to jobs graphviz processes at once.
+
+    The largest shards are started first, so a big one doesn't end up last
+    while the other workers are idle. Returns {name: output path}. """
+    order = sorted(paths, key=lambda name: os.path.getsize(paths[name]), reverse=True)
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        futures = {name: executor.submit(_render, engine, format, paths[name]) for name in order}
+        return {name: futures[name].result() for name in paths}
+
+
+def write_index(directory, shards, outputs, title='Ontology shards'):
+    """ Write index.html into directory, linking the output of every shard. Returns its path. """
+    rows = []
+    for name, nodes in shards.items():
+        link = os.path.relpath(outputs[name], directory)
+        rows.append('<li><a href="{}">{}</a> ({} nodes)</li>'.format(html.escape(link, quote=True),
+                                                                      html.escape(name), len(nodes)))
+    path = os.path.join(directory, 'index.html')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{0}</title></head>\n'
+                '<body><h1>{0}</h1>\n<ul>\n{1}\n</ul>\n</body></html>\n'.format(html.escape(title), '\n'.join(rows)))
+    return path
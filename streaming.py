@@ -0,0 +1,164 @@
+import io
+import re
+from hashlib import md5
+from rdflib import Graph
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser, r_wspace, r_tail, ParseError
+from inputs import iter_lines, open_input
+
+
+__all__ = ['iter_triples', 'iter_line_range', 'split_lines', 'STREAM_FORMATS', 'LINE_FORMATS']
+
+
+NT_FORMATS = {'nt', 'nt11', 'ntriples', 'n-triples'}
+NQ_FORMATS = {'nq', 'nquads', 'n-quads'}
+TTL_FORMATS = {'ttl', 'turtle'}
+LINE_FORMATS = NT_FORMATS | NQ_FORMATS
+STREAM_FORMATS = LINE_FORMATS | TTL_FORMATS
+
+r_directive = re.compile(r'\s*(@prefix|@base|prefix\s|base\s)', re.IGNORECASE)
+
+# a comment at the end of a line, unless the # may be inside a string or IRI
+r_comment = re.compile(r'(^|\s)#[^"\'<>]*$')
+
+# A chunk that doesn't parse is only retried once it has grown by half, and its
+# error is raised once it is this many times chunk_size. Otherwise a syntax
+# error makes every later statement boundary re-parse the whole chunk.
+MAX_CHUNK_GROWTH = 4
+
+
+class _LastTriple:
+    """ Minimal sink for W3CNTriplesParser keeping only the latest triple. """
+    def __init__(self):
+        self.value = None
+
+    def triple(self, s, p, o):
+        self.value = (s, p, o)
+
+
+class FileBNodes(dict):
+    """ Blank node context deriving the node from the file and label only.
+
+    Line ranges of one file parsed separately, even in different processes,
+    agree on every _:x while different files keep their blank nodes apart. """
+    def __init__(self, file):
+        super().__init__()
+        self.prefix = 'f{}'.format(md5(file.encode('utf-8')).hexdigest()[:8])
+
+    def get(self, key, default=None):
+        return '{}{}'.format(self.prefix, key)
+
+
+class _QuadsParser(W3CNTriplesParser):
+    """ N-Quads line parser that drops the graph label instead of requiring a context aware store. """
+    def parseline(self, bnode_context=None):
+        self.eat(r_wspace)
+        if (not self.line) or self.line.startswith('#'):
+            return
+        subject = self.subject(bnode_context)
+        self.eat(r_wspace)
+        predicate = self.predicate()
+        self.eat(r_wspace)
+        obj = self.object(bnode_context)
+        self.eat(r_wspace)
+        self.uriref() or self.nodeid(bnode_context)
+        self.eat(r_tail)
+        if self.line:
+            raise ParseError("Trailing garbage")
+        self.sink.triple(subject, predicate, obj)
+
+
+def iter_triples(files, format='ttl', namespace_manager=None, chunk_size=50000):
+    """ Yield (s, p, o) from the files without building a Graph of the whole input.
+
+    N-Triples and N-Quads are parsed line by line. Turtle is split into chunks of
+    roughly chunk_size lines on statement boundaries, every chunk is parsed on its
+    own together with the prefix directives seen so far and dropped afterwards.
+    Labelled blank nodes (_:x) are therefore scoped to a chunk for Turtle.
+    Prefixes declared in Turtle files are bound to namespace_manager if given. """
+    if isinstance(files, str):
+        files = [files]
+    format = format.lower()
+    if format not in STREAM_FORMATS:
+        raise ValueError("Streaming is not supported for format {}, "
+                         "use one of {}".format(format, ', '.join(sorted(STREAM_FORMATS))))
+    for file in files:
+        if format in TTL_FORMATS:
+            yield from _iter_turtle(file, namespace_manager, chunk_size)
+        else:
+            yield from iter_line_range(file, format)
+
+
+def iter_line_range(file, format='nt', start=0, end=None):
+    """ Yield the triples of the N-Triples/N-Quads lines starting in the byte range [start, end).
+
+    start must be at the beginning of a line, see split_lines. Compressed files
+    can only be read as a whole. """
+    sink = _LastTriple()
+    parser = (_QuadsParser if format in NQ_FORMATS else W3CNTriplesParser)(sink, FileBNodes(file))
+    for line in iter_lines(file, start, end):
+        parser.line = line
+        try:
+            parser.parseline()
+        except ParseError:
+            raise ParseError("Invalid line: {}".format(parser.line))
+        if sink.value is not None:
+            yield sink.value
+            sink.value = None
+
+
+def split_lines(file, parts):
+    """ Split a line based file into at most parts byte ranges aligned on line starts. """
+    with open(file, 'rb') as f:
+        size = f.seek(0, 2)
+        offsets = [0]
+        for i in range(1, parts):
+            f.seek(max(size * i // parts, offsets[-1]))
+            f.readline()
+            offset = f.tell()
+            if offset >= size:
+                break
+            if offset > offsets[-1]:
+                offsets.append(offset)
+    return list(zip(offsets, offsets[1:] + [size]))
+
+
+def _iter_turtle(file, namespace_manager, chunk_size):
+    directives = []
+    chunk = []
+    retry_at = 0
+    in_long_string = False
+    with io.TextIOWrapper(open_input(file), encoding='utf-8') as f:
+        for line in f:
+            if not in_long_string and r_directive.match(line):
+                directives.append(line)
+                continue
+            chunk.append(line)
+            if line.count('"""') % 2 or line.count("'''") % 2:
+                in_long_string = not in_long_string
+            if in_long_string or len(chunk) < max(chunk_size, retry_at) \
+                    or not r_comment.sub('', line.rstrip()).rstrip().endswith('.'):
+                continue
+            final = len(chunk) >= chunk_size * MAX_CHUNK_GROWTH
+            triples = _parse_turtle_chunk(directives, chunk, namespace_manager, final)
+            if triples is None:
+                retry_at = len(chunk) * 3 // 2
+                continue  # the boundary was inside a statement, keep reading
+            chunk = []
+            retry_at = 0
+            yield from triples
+    if chunk:
+        yield from _parse_turtle_chunk(directives, chunk, namespace_manager, final=True)
+
+
+def _parse_turtle_chunk(directives, chunk, namespace_manager, final):
+    g = Graph()
+    try:
+        g.parse(data=''.join(directives + chunk), format='turtle')
+    except Exception:
+        if final:
+            raise
+        return None
+    if namespace_manager is not None:
+        for prefix, namespace in g.namespaces():
+            namespace_manager.bind(prefix, namespace, override=False)
+    return g
@@ -0,0 +1,68 @@
+from collections import defaultdict, deque
+
+
+__all__ = ['Adjacency']
+
+
+class Adjacency:
+    """ Outgoing and incoming edges of every node, built once from the edges of an OntologyGraph.
+
+    Queries follow edges in both directions and only touch the nodes they reach,
+    so their cost doesn't depend on the size of the whole graph. """
+    def __init__(self, edges, literals=()):
+        self.out = defaultdict(list)
+        self.inc = defaultdict(list)
+        for s, p, o in edges:
+            self.out[s].append((p, o))
+            self.inc[o].append((p, s))
+        self.literals = dict(literals)
+
+    def __contains__(self, node):
+        return node in self.out or node in self.inc
+
+    def neighbors(self, node):
+        for _, o in self.out.get(node, ()):
+            yield o
+        for _, s in self.inc.get(node, ()):
+            yield s
+
+    def neighborhood(self, seeds, hops=1):
+        """ Nodes within hops edges of any seed. """
+        seen = set(seeds)
+        frontier = list(seen)
+        for _ in range(hops):
+            reached = []
+            for node in frontier:
+                for neighbor in self.neighbors(node):
+                    if neighbor not in seen:
+                        seen.add(neighbor)
+                        reached.append(neighbor)
+            if not reached:
+                break
+            frontier = reached
+        return seen
+
+    def path(self, source, target):
+        """ Nodes of a shortest path from source to target, or None if they aren't connected. """
+        previous = {source: None}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            if node == target:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = previous[node]
+                return path[::-1]
+            for neighbor in self.neighbors(node):
+                if neighbor not in previous:
+                    previous[neighbor] = node
+                    queue.append(neighbor)
+        return None
+
+    def edges_within(self, nodes):
+        """ Edges whose both ends are in nodes. """
+        for s in nodes:
+            for p, o in self.out.get(s, ()):
+                if o in nodes:
+                    yield s, p, o
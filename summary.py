@@ -0,0 +1,89 @@
+import math
+from collections import Counter
+from rdflib.namespace import RDF
+from graph_element import Node
+from ontology_viz import OntologyGraph, node_color
+
+
+__all__ = ['SummaryGraph']
+
+
+UNTYPED = 'untyped'
+LITERAL = 'literal'
+
+
+class SummaryGraph(OntologyGraph):
+    """ OntologyGraph drawn at class level.
+
+    Every instance is counted into its class and every edge into an edge between
+    the classes of its ends, labeled with the number of triples. Instances
+    without a class and literal values each get one shared node. The counts
+    are taken in one pass over the edges, so together with stream=True only the
+    instance to class map is held in memory. """
+    def __init__(self, files, config, format='ttl', ontology=None, stream=False, jobs=1, cache=None,
+                 compact=False, profiler=None):
+        super().__init__(files, config, format, ontology=ontology, stream=stream, jobs=jobs, cache=cache,
+                         compact=compact, profiler=profiler)
+        self.counts = None
+
+    def group(self, node, subject=False):
+        """ The node of the summary that node is counted into. """
+        class_ = self.instances.get(node)
+        if class_ is not None:
+            return class_
+        if node in self.classes:
+            return node
+        if subject or node in self.instances:
+            return UNTYPED
+        return LITERAL  # objects are instances unless they are literal ids
+
+    def summarize(self):
+        """ (instances per class, triples per (class, predicate, class)), computed once. """
+        if self.counts is None:
+            nodes = Counter({class_: 0 for class_ in self.classes})
+            for instance, class_ in self.instances.items():
+                if class_ is not None or instance not in self.classes:
+                    nodes[self.group(instance)] += 1
+            edges = Counter()
+            for s, p, o in self.edges:
+                if p == RDF.type and self.instances.get(s) is not None:
+                    continue  # counted as an instance of o
+                edges[self.group(s, True), p, self.group(o)] += 1
+            for s, _, o in edges:
+                nodes[s] += 0
+                nodes[o] += 0
+            self.counts = nodes, edges
+        return self.counts
+
+    def _graph_ids(self):
+        nodes, edges = self.summarize()
+        nodes = list(nodes)
+        index = {uri: i for i, uri in enumerate(nodes)}
+        return nodes, [(index[s], index[o]) for s, _, o in edges]
+
+    def iter_nodes(self):
+        nodes, _ = self.summarize()
+        for uri, count in nodes.items():
+            if uri == LITERAL:
+                node = Node(uri, style=node_color(self.config.colors.lit))
+                node.update({"label": "Literal", "shape": "rect"})
+            else:
+                if uri == UNTYPED:
+                    node = Node(uri, style=node_color(self.config.get_ins_color(None)))
+                    label = "(untyped)"
+                elif uri in self.classes:
+                    node = Node(uri, style=node_color(self.config.get_cls_color(uri)))
+                    label = self.compute_label(uri, self.config.max_label_length)
+                else:
+                    node = Node(uri, style=node_color(self.config.get_ins_color(uri)))
+                    label = self.compute_label(uri, self.config.max_label_length)
+                if count:
+                    label = '{}\\n{} instance{}'.format(label, count, '' if count == 1 else 's')
+                node.update({"label": label})
+            yield node.to_draw()
+
+    def iter_edges(self):
+        _, edges = self.summarize()
+        for (s, p, o), count in edges.items():
+            yield '  "{}" -> "{}" [label="{} ({})" penwidth="{:.1f}"]'.format(
+                s, o, self._pred_label(p), count, 1 + math.log10(count))
@@ -0,0 +1,106 @@
+import random
+from unicodedata import category
+from namespace import (split_uri, is_ncname, NAME_START_CATEGORIES, NAME_CATEGORIES, SPLIT_START_CATEGORIES,
+                       ALLOWED_NAME_CHARS, XMLNS)
+
+
+# The plain character walks split_uri and is_ncname started from, the fast
+# versions must agree with them on every input.
+
+def reference_is_ncname(name):
+    if name:
+        first = name[0]
+        if first == "_" or category(first) in NAME_START_CATEGORIES:
+            for i in range(1, len(name)):
+                c = name[i]
+                if not category(c) in NAME_CATEGORIES:
+                    if c != ':' and c in ALLOWED_NAME_CHARS:
+                        continue
+                    return 0
+            return 1
+    return 0
+
+
+def reference_split_uri(uri, split_start=SPLIT_START_CATEGORIES):
+    if uri.startswith(XMLNS):
+        return (XMLNS, uri.split(XMLNS)[1])
+    length = len(uri)
+    for i in range(0, length):
+        c = uri[-i - 1]
+        if not category(c) in NAME_CATEGORIES:
+            if c in ALLOWED_NAME_CHARS:
+                continue
+            for j in range(-1 - i, length):
+                if category(uri[j]) in split_start or uri[j] == "_":
+                    ns = uri[:j]
+                    if not ns:
+                        break
+                    ln = uri[j:]
+                    return (ns, ln)
+            break
+    raise ValueError("Can't split '{}'".format(uri))
+
+
+# URI-ish pieces together with characters of every category the walks look at:
+# letters, digits, marks, modifiers, the allowed punctuation and separators
+ALPHABET = list('abcXYZ019_-.:/#?=&%~ ') + [
+    '\u00b7', '\u0387', '\u00e9', '\u00c9', '\u01c5', '\u02b0', '\u0301', '\u0903', '\u20dd',
+    '\u2160', '\u0660', '\u4e2d', '\uf900', '\u00a0', '\U0001d400']
+PIECES = ['http://example.org/', 'https://w3.org/ns#', 'urn:x:', XMLNS, '/', '#', '']
+
+
+def random_strings(count, seed=0):
+    rnd = random.Random(seed)
+    for _ in range(count):
+        body = ''.join(rnd.choice(ALPHABET) for _ in range(rnd.randrange(0, 12)))
+        yield rnd.choice(PIECES) + body
+
+
+def outcome(function, *args):
+    try:
+        return function(*args)
+    except ValueError as e:
+        return ValueError, str(e)
+
+
+def test_split_uri_matches_reference():
+    for uri in random_strings(50000):
+        assert outcome(split_uri, uri) == outcome(reference_split_uri, uri), uri
+        assert outcome(split_uri, uri, NAME_START_CATEGORIES) == \
+            outcome(reference_split_uri, uri, NAME_START_CATEGORIES), uri
+
+
+def test_is_ncname_matches_reference():
+    for name in random_strings(50000, seed=1):
+        for value in (name, name.rpartition('/')[2]):
+            assert is_ncname(value) == reference_is_ncname(value), value
+
+
+def test_split_uri_examples():
+    assert split_uri('http://example.org/onto#Person') == ('http://example.org/onto#', 'Person')
+    assert split_uri('http://example.org/item/42') == ('http://example.org/item/', '42')
+    assert split_uri('http://example.org/été') == ('http://example.org/', 'été')
+    assert split_uri(XMLNS + 'lang') == (XMLNS, 'lang')
+    for uri in ('http://example.org/', 'abc'):
+        try:
+            split_uri(uri)
+        except ValueError:
+            continue
+        raise AssertionError(uri)
+
+
+def test_compute_qname_of_a_bound_namespace():
+    from rdflib import Graph, URIRef
+    from namespace import NamespaceManager
+    g = Graph()
+    g.namespace_manager = NamespaceManager(g)
+    g.namespace_manager.bind('ex', 'http://example.org/onto/')
+    assert g.namespace_manager.compute_qname(URIRef('http://example.org/onto/')) == \
+        ('ex', URIRef('http://example.org/onto/'), '')
+    assert g.namespace_manager.qname(URIRef('http://example.org/onto/')) == 'ex:'
+    try:
+        g.namespace_manager.compute_qname_strict(URIRef('http://example.org/onto/'))
+    except ValueError:
+        pass  # an NCName can't be empty
+    else:
+        raise AssertionError('http://example.org/onto/ has no strict qname')
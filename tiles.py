@@ -0,0 +1,198 @@
+import json
+import math
+import os
+import shlex
+from collections import Counter, defaultdict
+from xml.sax.saxutils import escape, quoteattr
+from export import iter_node_data, iter_edge_data
+
+
+__all__ = ['write_tiles', 'plain_positions']
+
+
+TILE_SIZE = 256
+NODE_RADIUS = 5  # pixels
+FONT_SIZE = 10  # pixels
+
+
+def plain_positions(text):
+    """ {node id: (x, y)} in points from the output of graphviz -Tplain. """
+    positions = {}
+    for line in text.splitlines():
+        if line.startswith('node '):
+            _, name, x, y = shlex.split(line)[:4]
+            positions[name] = (float(x) * 72, float(y) * 72)
+    return positions
+
+
+def _bounds(points):
+    xs = [x for x, _ in points]
+    ys = [y for _, y in points]
+    if not xs:
+        return 0.0, 0.0, 1.0
+    x0, y0 = min(xs), min(ys)
+    side = max(max(xs) - x0, max(ys) - y0, 1.0)
+    margin = side * 0.02
+    return x0 - margin, y0 - margin, side + 2 * margin
+
+
+def _tile_range(low, high, origin, step, count):
+    return range(max(int((low - origin) // step), 0), min(int((high - origin) // step), count - 1) + 1)
+
+
+class _Level:
+    """ The nodes and edges of one zoom level bucketed into its 2^z x 2^z tiles. """
+    def __init__(self, z, bounds):
+        self.z = z
+        self.count = 1 << z
+        self.x0, self.y0, side = bounds
+        self.step = side / self.count
+        self.scale = self.step / TILE_SIZE  # world units per pixel
+        self.nodes = defaultdict(list)
+        self.edges = defaultdict(list)
+
+    def _tiles(self, x_low, y_low, x_high, y_high):
+        for i in _tile_range(x_low, x_high, self.x0, self.step, self.count):
+            for j in _tile_range(y_low, y_high, self.y0, self.step, self.count):
+                yield i, j
+
+    def add_node(self, node, x, y):
+        r = (NODE_RADIUS + FONT_SIZE * 4) * self.scale  # room for the label
+        for tile in self._tiles(x - r, y - r, x + r, y + r):
+            self.nodes[tile].append((node, x, y))
+
+    def _cell(self, value, origin):
+        return min(max(int((value - origin) // self.step), 0), self.count - 1)
+
+    def _segment_tiles(self, a, b):
+        """ The tiles the segment from a to b crosses, walked from tile to tile (Amanatides and Woo). """
+        (x1, y1), (x2, y2) = a, b
+        i, j = self._cell(x1, self.x0), self._cell(y1, self.y0)
+        end_i, end_j = self._cell(x2, self.x0), self._cell(y2, self.y0)
+        step_i, step_j = (1 if x2 > x1 else -1), (1 if y2 > y1 else -1)
+        dx, dy = abs(x2 - x1), abs(y2 - y1)
+        # fraction of the segment at which the next tile border of each axis is crossed
+        t_x = abs(self.x0 + (i + (step_i > 0)) * self.step - x1) / dx if dx else math.inf
+        t_y = abs(self.y0 + (j + (step_j > 0)) * self.step - y1) / dy if dy else math.inf
+        delta_x = self.step / dx if dx else math.inf
+        delta_y = self.step / dy if dy else math.inf
+        yield i, j
+        while (i, j) != (end_i, end_j):
+            # an axis at its end tile stops, a segment ending on a border doesn't cross it
+            next_x = t_x if i != end_i else math.inf
+            next_y = t_y if j != end_j else math.inf
+            if next_x < next_y:
+                i += step_i
+                t_x += delta_x
+            elif next_y < next_x:
+                j += step_j
+                t_y += delta_y
+            else:
+                # through a corner, the line has a width so it shows on both neighbors too
+                yield i + step_i, j
+                yield i, j + step_j
+                i, j = i + step_i, j + step_j
+                t_x += delta_x
+                t_y += delta_y
+            yield i, j
+
+    def add_edge(self, edge, a, b):
+        for tile in self._segment_tiles(a, b):
+            self.edges[tile].append((edge, a, b))
+
+    def svg(self, tile):
+        i, j = tile
+        left, top = self.x0 + i * self.step, self.y0 + j * self.step
+        s = self.scale
+        parts = ['<svg xmlns="http://www.w3.org/2000/svg" width="{0}" height="{0}" '
+                 'viewBox="{1:.3f} {2:.3f} {3:.3f} {3:.3f}">'.format(TILE_SIZE, left, top, self.step),
+                 '<g stroke="#999999" fill="none">']
+        for edge, (x1, y1), (x2, y2) in self.edges.get(tile, ()):
+            width = (1 + math.log10(edge['count'])) * s if 'count' in edge else s
+            parts.append('<line x1="{:.2f}" y1="{:.2f}" x2="{:.2f}" y2="{:.2f}" stroke-width="{:.3f}"/>'.format(
+                x1, y1, x2, y2, width))
+        parts.append('</g>')
+        for node, x, y in self.nodes.get(tile, ()):
+            parts.append('<circle cx="{:.2f}" cy="{:.2f}" r="{:.3f}" fill={}><title>{}</title></circle>'.format(
+                x, y, NODE_RADIUS * s, quoteattr(node.get('color') or '#cccccc'), escape(node['id'])))
+            if node['label']:
+                parts.append('<text x="{:.2f}" y="{:.2f}" font-size="{:.3f}" font-family="sans-serif">{}</text>'.format(
+                    x + NODE_RADIUS * s * 1.5, y + FONT_SIZE * s / 3, FONT_SIZE * s, escape(node['label'])))
+        parts.append('</svg>')
+        return '\n'.join(parts)
+
+
+def _summary(nodes, edges):
+    """ Class nodes with their instance counts and the edges between the classes of their ends. """
+    group = {}
+    counts = Counter()
+    for node in nodes:
+        if node['category'] == 'class':
+            group[node['id']] = node['id']
+        elif 'class' in node:
+            group[node['id']] = node['class']
+            counts[node['class']] += 1
+    classes = [dict(node, label='{} ({})'.format(node['label'], counts[node['id']])) if counts[node['id']] else node
+               for node in nodes if node['category'] == 'class']
+    between = Counter()
+    for edge in edges:
+        s, o = group.get(edge['source']), group.get(edge['target'])
+        if s is not None and o is not None and s != o:
+            between[s, o] += 1
+    return classes, [{'source': s, 'target': o, 'count': count} for (s, o), count in between.items()]
+
+
+def write_tiles(og, positions, directory, levels=4, detail_level=None, format='svg'):
+    """ Write a quadtree of tiles of the positioned graph into directory and a manifest.json.
+
+    Level z is cut into 2^z x 2^z tiles of TILE_SIZE pixels. Levels below
+    detail_level (default: the second finest) only draw the classes and one
+    edge per pair of classes, weighted by the number of edges between their
+    instances; the others draw every node and edge. Only tiles with content
+    are written, none for an empty graph. png tiles need cairosvg. positions maps node ids to (x, y) in
+    points, with y growing upwards as in graphviz. Returns the manifest. """
+    if format == 'png':
+        try:
+            import cairosvg
+        except ImportError:
+            raise ImportError("You don't have cairosvg package installed.\n"
+                              "Please install cairosvg to write png tiles, or write svg tiles.")
+    elif format != 'svg':
+        raise ValueError("Can't write {} tiles, use svg or png".format(format))
+    if detail_level is None:
+        detail_level = max(levels - 2, 0)
+    nodes = list(iter_node_data(og))
+    edges = list(iter_edge_data(og))
+    positions = {str(node): position for node, position in positions.items()}
+    top = max((y for _, y in positions.values()), default=0.0)
+    positions = {node: (x, top - y) for node, (x, y) in positions.items()}  # svg y grows downwards
+    bounds = _bounds(positions.values())
+    coarse = _summary(nodes, edges)
+    manifest = {'tile_size': TILE_SIZE, 'levels': levels, 'detail_level': detail_level, 'format': format,
+                'bounds': list(bounds), 'tiles': {}}
+    for z in range(levels):
+        level = _Level(z, bounds)
+        level_nodes, level_edges = (nodes, edges) if z >= detail_level else coarse
+        for node in level_nodes:
+            if node['id'] in positions:
+                level.add_node(node, *positions[node['id']])
+        for edge in level_edges:
+            if edge['source'] in positions and edge['target'] in positions:
+                level.add_edge(edge, positions[edge['source']], positions[edge['target']])
+        written = []
+        for tile in sorted(set(level.nodes) | set(level.edges)):
+            path = os.path.join(str(z), '{}_{}.{}'.format(tile[0], tile[1], format))
+            os.makedirs(os.path.join(directory, str(z)), exist_ok=True)
+            svg = level.svg(tile)
+            if format == 'png':
+                cairosvg.svg2png(bytestring=svg.encode('utf-8'), write_to=os.path.join(directory, path))
+            else:
+                with open(os.path.join(directory, path), 'w', encoding='utf-8') as f:
+                    f.write(svg)
+            written.append(list(tile))
+        manifest['tiles'][str(z)] = written
+    manifest['path'] = '{z}/{x}_{y}.' + format
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
@@ -1,5 +1,5 @@
 from rdflib import URIRef
-from rdflib.namespace import Namespace
+from rdflib.namespace import Namespace, RDF
 import re
 
 
@@ -13,6 +13,12 @@ class Colors:
     filled = True
 
 
+LITERAL_MODES = ('triple', 'subject', 'global', 'fold')
+
+# how OntologyGraph reads the triples of a predicate, see Config.predicate_kinds
+TYPE, LABEL, TOOLTIP, CLASS, SKIP = 'type', 'label', 'tooltip', 'class', 'skip'
+
+
 class Config:
     def __init__(self, config_file=None):
         self.blacklist = set()
@@ -22,7 +28,10 @@ class Config:
         self.label_property = set()
         self.tooltip_property = set()
         self.bnode_regex = list()
+        self.bnode_pattern = None
+        self.literal_mode = 'triple'
         self.colors = Colors()
+        self.color_cache = {'ins': {}, 'cls': {}}
         if config_file:
             self.read_config_file(config_file)
 
@@ -37,6 +46,10 @@ class Config:
             self.label_property = {URIRef(x) for x in config.get('label_property', [])}
             self.tooltip_property = {URIRef(x) for x in config.get('tooltip_property', [])}
             self.bnode_regex = [re.compile(pattern) for pattern in config.get('bnode_regex', [])]
+            self.bnode_pattern = self._combine(self.bnode_regex)
+            self.literal_mode = config.get('literal_mode', 'triple')
+            if self.literal_mode not in LITERAL_MODES:
+                raise ValueError("literal_mode {} isn't one of {}".format(self.literal_mode, ', '.join(LITERAL_MODES)))
         if 'colors' in config:
             config_color = ConfigColor()
             colors = config['colors']
@@ -44,18 +57,66 @@ class Config:
             self.colors.lit = config_color.parse(colors.get('literal', self.colors.lit), self.colors.lit)
             self.colors.ins = config_color.parse(colors.get('instance', self.colors.ins))
             self.colors.filled = colors.get('filled', True)
+        self.color_cache = {'ins': {}, 'cls': {}}
 
-    def get_ins_color(self, cls):
+    @staticmethod
+    def _combine(patterns):
+        """ One alternation of all patterns, so a node is matched in a single pass. """
+        if not patterns:
+            return None
+        try:
+            return re.compile('|'.join('(?:{})'.format(pattern.pattern) for pattern in patterns))
+        except re.error:
+            return None  # e.g. inline flags, bnode_regex_match tries the patterns one by one
+
+    def fingerprint(self):
+        """ A stable string of every setting that changes how triples are classified. """
+        colors = self.colors.ins
+        if isinstance(colors, dict):
+            colors = sorted(colors.items())
+        return repr((
+            sorted(self.blacklist),
+            sorted(self.class_inference_in_object),
+            sorted(self.label_property),
+            sorted(self.tooltip_property),
+            self.literal_mode,
+            colors
+        ))
+
+    def predicate_kinds(self):
+        """ Dispatch table of predicate to TYPE, LABEL, TOOLTIP, CLASS or SKIP, so a triple is
+        classified with one lookup. Predicates that aren't in it link to an instance or a literal. """
+        kinds = dict.fromkeys(self.class_inference_in_object, CLASS)
+        kinds.update(dict.fromkeys(self.tooltip_property, TOOLTIP))
+        kinds.update(dict.fromkeys(self.label_property, LABEL))
+        kinds[RDF.type] = TYPE
+        kinds.update(dict.fromkeys(self.blacklist, SKIP))
+        return kinds
+
+    def colored_classes(self):
+        """ Classes whose instances have their own color, they aren't drawn as class nodes. """
         if isinstance(self.colors.ins, dict):
-            return self.colors.ins.get(str(cls), self.colors.ins['default'])
-        return self.colors.ins
+            return {URIRef(cls) for cls in self.colors.ins}
+        return set()
+
+    def get_ins_color(self, cls):
+        return self._color(self.colors.ins, self.color_cache['ins'], cls)
 
     def get_cls_color(self, cls):
-        if isinstance(self.colors.cls, dict):
-            return self.colors.cls.get(str(cls), self.colors.cls['default'])
-        return self.colors.cls
+        return self._color(self.colors.cls, self.color_cache['cls'], cls)
+
+    @staticmethod
+    def _color(colors, cache, cls):
+        if not isinstance(colors, dict):
+            return colors
+        color = cache.get(cls)
+        if color is None:
+            color = cache[cls] = colors.get(str(cls), colors['default'])
+        return color
 
     def bnode_regex_match(self, uri):
+        if self.bnode_pattern is not None:
+            return self.bnode_pattern.match(uri) is not None
         for pattern in self.bnode_regex:
             if pattern.match(uri):
                 return True
@@ -0,0 +1,208 @@
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from rdflib import Graph, Literal
+from inputs import parse_file, PARSE_ERRORS
+from rdflib.namespace import RDF, OWL
+from namespace import NamespaceManager
+from ontology_viz import OntologyGraph
+from streaming import LINE_FORMATS, iter_line_range
+
+
+__all__ = ['IncrementalOntologyGraph', 'watch']
+
+
+def read_triples(file, format='ttl', namespace_manager=None):
+    """ Set of the triples of the file. Prefixes declared in it are bound to namespace_manager if given. """
+    if format in LINE_FORMATS:
+        # blank node labels are stable between reads, so unchanged lines diff as unchanged
+        return set(iter_line_range(file, format))
+    g = Graph()
+    g.namespace_manager = NamespaceManager(g)  # only the prefixes of the file, not the rdflib defaults
+    parse_file(g, file, format)
+    if namespace_manager is not None:
+        for prefix, namespace in g.namespaces():
+            namespace_manager.bind(prefix, namespace)  # like parsing into it, replacing generated prefixes
+    return set(g)
+
+
+class IncrementalOntologyGraph(OntologyGraph):
+    """ OntologyGraph that keeps the triples of every file and applies file changes as a diff.
+
+    Added triples go through _read_triple. For removed triples only the entries
+    they contributed to are derived again from the remaining triples of the
+    nodes involved, so the cost of an update follows the size of the change.
+    Blank nodes in Turtle files get new ids on every parse, their triples are
+    always treated as changed. """
+    def __init__(self, files, config, format='ttl', ontology=None, cache=None):
+        super().__init__([], config, format, ontology=ontology, cache=cache)
+        if isinstance(files, str):
+            files = [files]
+        self.format = format
+        self.file_triples = {}
+        self.counts = Counter()
+        self.index = defaultdict(set)
+        self.dot_cache = {}
+        self.literal_refs = Counter()
+        for file in files:
+            self.update(file)
+
+    def update(self, file):
+        """ Read the file again and apply the difference to the previous version. Returns (added, removed). """
+        namespaces = set(self.g.namespaces())
+        new = read_triples(file, self.format, self.g.namespace_manager) if os.path.exists(file) else set()
+        if set(self.g.namespaces()) != namespaces:
+            # qnames and labels of unchanged nodes may use a new prefix
+            self.g.namespace_manager.reset()
+            self.dot_cache.clear()
+        old = self.file_triples.get(file, set())
+        self.file_triples[file] = new
+        added, removed = [], []
+        for triple in new - old:
+            self.counts[triple] += 1
+            if self.counts[triple] == 1:
+                added.append(triple)
+        for triple in old - new:
+            self.counts[triple] -= 1
+            if not self.counts[triple]:
+                del self.counts[triple]
+                removed.append(triple)
+        self.apply(added, removed)
+        return added, removed
+
+    def _nodes(self, triple):
+        s, _, o = triple
+        return (s,) if isinstance(o, Literal) else (s, o)
+
+    def apply(self, added, removed):
+        blacklist = self.config.blacklist
+        self.label_cache.clear()
+        self.adjacency_index = None
+        if self.config.literal_mode == 'fold' and any(p in self.config.label_property for _, p, _ in added + removed):
+            self.dot_cache.clear()  # the tooltips of other nodes name properties by their labels
+        for triple in removed:
+            if any(uri in blacklist for uri in triple):
+                continue
+            for node in self._nodes(triple):
+                self.index[node].discard(triple)
+                self.dot_cache.pop(node, None)
+            self._retract_triple(*triple)
+        for triple in added:
+            if any(uri in blacklist for uri in triple):
+                continue
+            for node in self._nodes(triple):
+                self.index[node].add(triple)
+                self.dot_cache.pop(node, None)
+            literal_id = self._literal_node(*triple)
+            if literal_id is not None:
+                self.literal_refs[literal_id] += 1
+            self._read_triple(*triple)
+
+    def _literal_node(self, s, p, o):
+        """ Id of the literal node the triple points to, if it makes one. """
+        if not isinstance(o, Literal) or self.config.literal_mode == 'fold' or p == RDF.type \
+                or p in self.config.label_property or p in self.config.tooltip_property:
+            return None
+        return self._literal_id(s, p, o)
+
+    def _retract_triple(self, s, p, o):
+        if p == RDF.type:
+            if o == OWL.Class:
+                self._derive_class(s)
+            else:
+                self._derive_instance(s)
+                self._derive_class(o)
+                self.edges.discard((s, p, o))
+        elif p in self.config.label_property:
+            labels = [label for s_, p_, label in self.index[s] if s_ == s and p_ in self.config.label_property]
+            if labels:
+                self.labels[s] = labels[0]
+            else:
+                self.labels.pop(s, None)
+        elif p in self.config.tooltip_property:
+            if o in self.tooltips.get(s, ()):
+                self.tooltips[s].remove(o)
+        elif isinstance(o, Literal):
+            if self.config.literal_mode == 'fold':
+                if (p, o) in self.tooltips.get(s, ()):
+                    self.tooltips[s].remove((p, o))
+                return
+            literal_id = self._literal_id(s, p, o)
+            self.edges.discard((s, p, literal_id))
+            self.literal_refs[literal_id] -= 1
+            if not self.literal_refs[literal_id]:
+                # literal nodes can be shared, see Config.literal_mode
+                del self.literal_refs[literal_id]
+                self.literals.discard((literal_id, o))
+        else:
+            if p in self.config.class_inference_in_object:
+                self._derive_class(o)
+            self._derive_instance(o)
+            self.edges.discard((s, p, o))
+
+    def _supports_class(self, cls, triple):
+        s, p, o = triple
+        if s == cls and p == RDF.type and o == OWL.Class:
+            return True
+        if o != cls:
+            return False
+        if p == RDF.type:
+            return o not in self.colored
+        return p in self.config.class_inference_in_object and not isinstance(o, Literal)
+
+    def _derive_class(self, cls):
+        if any(self._supports_class(cls, triple) for triple in self.index[cls]):
+            self.classes.add(cls)
+        else:
+            self.classes.discard(cls)
+
+    def _derive_instance(self, node):
+        referenced = False
+        for s, p, o in self.index[node]:
+            if s == node and p == RDF.type and o != OWL.Class:
+                self.instances[node] = o
+                return
+            if o == node and p != RDF.type and p not in self.config.label_property \
+                    and p not in self.config.tooltip_property:
+                referenced = True
+        if referenced:
+            self.instances[node] = None
+        else:
+            self.instances.pop(node, None)
+
+    def _dot_node(self, uri, attrs):
+        key = (uri, tuple(attrs.items()))
+        line = self.dot_cache.get(uri)
+        if line is None or line[0] != key:
+            line = self.dot_cache[uri] = (key, super()._dot_node(uri, attrs))
+        return line[1]
+
+
+def watch(og, files, output, interval=1.0):
+    """ Poll the files and rewrite output whenever one of them changed. A file that doesn't
+    parse is reported and read again when it changes next. """
+    if isinstance(files, str):
+        files = [files]
+    mtimes = {file: os.stat(file).st_mtime_ns for file in files}
+    og.write_file(output)
+    while True:
+        time.sleep(interval)
+        changed = False
+        for file in files:
+            mtime = os.stat(file).st_mtime_ns if os.path.exists(file) else None
+            if mtime == mtimes[file]:
+                continue
+            mtimes[file] = mtime
+            started = time.time()
+            try:
+                added, removed = og.update(file)
+            except PARSE_ERRORS + (UnicodeDecodeError,) as e:
+                # e.g. saved while half edited, the graph keeps the previous version until the next change
+                print("[WATCH] {}: {}".format(file, e), file=sys.stderr)
+                continue
+            print("[WATCH] {}: +{} -{} triples in {:.3f}s".format(file, len(added), len(removed),
+                                                                 time.time() - started), file=sys.stderr)
+            changed = changed or added or removed
+        if changed:
+            og.write_file(output)